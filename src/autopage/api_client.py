@@ -15,26 +15,49 @@ Usage:
     python api_client.py icons PACK_ID                            # List icons in a pack
     python api_client.py get-property [--serial SERIAL] PROP      # Read a property
     python api_client.py listen                                   # Listen for property changes
+    python api_client.py listen --json [--path P] [--property N]  # ... as JSON lines, filtered
+    python api_client.py bench [-n N] [--page-size KEYS]          # Measure round-trip latency
+    python api_client.py batch [FILE]                             # Run commands from FILE/stdin
 """
 
 import argparse
+import contextlib
+import io
+import json
+import math
+import os
 import re
+import shlex
 import sys
+import threading
+import time
+from collections.abc import Collection, Iterable
+from concurrent.futures import Future
 
-from dasbus.connection import SessionMessageBus
-from gi.repository import GLib
+# dasbus and gi.repository are imported where they are used, so that
+# importing this module (for its constants, or for --help) stays cheap.
 
 SERVICE = "com.core447.StreamController"
 OBJECT = "/com/core447/StreamController"
 IFACE = "com.core447.StreamController"
 CTRL_IFACE = "com.core447.StreamController.Controller"
 CTRL_BASE = OBJECT + "/controllers"
+DBUS_SERVICE = "org.freedesktop.DBus"
+DBUS_PATH = "/org/freedesktop/DBus"
+# Default cap on page pushes outstanding at once in push_pages()
+MAX_PUSHES_IN_FLIGHT = 8
+# Root properties kept in a local mirror, updated from PropertiesChanged
+MIRRORED_PROPERTIES = ("Pages", "Controllers")
 
 
 def _serial_to_dbus_path(serial: str) -> str:
     return re.sub(r"[^A-Za-z0-9_]", "_", serial)
 
 
+def _ctrl_path(serial: str) -> str:
+    return f"{CTRL_BASE}/{_serial_to_dbus_path(serial)}"
+
+
 _singleton_client: "StreamControllerClient | None" = None
 
 
@@ -46,76 +69,526 @@ def get_client() -> "StreamControllerClient":
     return _singleton_client
 
 
-class StreamControllerClient:
-    """Client for the StreamController DBus API."""
+class AsyncStreamControllerClient:
+    """Non-blocking client for the StreamController DBus API.
+
+    Every operation returns a :class:`concurrent.futures.Future` straight
+    away.  Calls are issued from a private GLib main loop thread, so replies
+    arrive even while the caller's own main loop is busy, and many calls
+    can be in flight at once.  From asyncio, use ``asyncio.wrap_future()``.
+
+    Proxies are created once and reused; they are dropped whenever the
+    owner of the StreamController bus name changes (service restart), so
+    the next call re-introspects the new instance.
+
+    ``Pages`` and ``Controllers`` are read over DBus once and then served
+    from a local mirror that ``PropertiesChanged`` signals (and this
+    client's own successful ``AddPage``/``RemovePage`` calls) keep current.
+    """
+
+    def __init__(self, bus=None):
+        from gi.repository import GLib
+
+        if bus is None:
+            from dasbus.connection import SessionMessageBus
+
+            bus = SessionMessageBus()
+        self._bus = bus
+        self._root = None
+        self._controllers: dict[str, object] = {}
+        self._owner_subscription: int | None = None
+        self._state_subscription: int | None = None
+        self._mirror: dict[str, list[str]] = {}
+        self._context = GLib.MainContext.new()
+        self._loop = GLib.MainLoop.new(self._context, False)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def bus(self):
+        """The dasbus message bus this client talks over."""
+        return self._bus
+
+    # ── Loop thread ──────────────────────────────────────────────────
+
+    def _run_loop(self) -> None:
+        # Async replies are dispatched to the thread-default context of the
+        # thread that issued the call, i.e. this one.
+        self._context.push_thread_default()
+        self._loop.run()
+
+    def _submit(self, start) -> Future:
+        """Run ``start(future)`` on the loop thread; it must arrange to resolve *future*."""
+        from gi.repository import GLib
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run_loop, name="streamclient-dbus", daemon=True
+                )
+                self._thread.start()
+
+        future: Future = Future()
+
+        def run():
+            if future.set_running_or_notify_cancel():
+                try:
+                    start(future)
+                except Exception as exc:
+                    future.set_exception(exc)
+            return GLib.SOURCE_REMOVE
+
+        self._context.invoke_full(GLib.PRIORITY_DEFAULT, run)
+        return future
+
+    def _call(
+        self,
+        get_proxy,
+        method: str,
+        *args,
+        timeout: int | None = None,
+        convert=None,
+        on_success=None,
+    ):
+        """Invoke a DBus method asynchronously through a (cached) dasbus proxy.
+
+        *on_success* runs on the loop thread before the future resolves.
+        """
 
-    def __init__(self):
-        self._bus = SessionMessageBus()
+        def start(future: Future):
+            def done(call):
+                try:
+                    result = call()
+                except Exception as exc:
+                    future.set_exception(exc)
+                else:
+                    if on_success is not None:
+                        on_success()
+                    future.set_result(convert(result) if convert else result)
+
+            kwargs = {"callback": done}
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+            getattr(get_proxy(), method)(*args, **kwargs)
+
+        return self._submit(start)
+
+    def _get(
+        self, path: str, iface: str, name: str, convert=None, on_value=None, before=None
+    ) -> Future:
+        """Read a DBus property asynchronously.
+
+        *before* is called on the loop thread just before the ``Get`` is
+        sent, and *on_value* with the converted value before the future
+        resolves.
+        """
+        from gi.repository import Gio, GLib
+
+        def start(future: Future):
+            def done(conn, result):
+                try:
+                    (value,) = conn.call_finish(result).unpack()
+                except Exception as exc:
+                    future.set_exception(exc)
+                else:
+                    value = convert(value) if convert else value
+                    if on_value is not None:
+                        on_value(value)
+                    future.set_result(value)
+
+            self._watch_owner()
+            if before is not None:
+                before()
+            self._bus.connection.call(
+                SERVICE,
+                path,
+                "org.freedesktop.DBus.Properties",
+                "Get",
+                GLib.Variant("(ss)", (iface, name)),
+                GLib.VariantType.new("(v)"),
+                Gio.DBusCallFlags.NONE,
+                -1,
+                None,
+                done,
+            )
+
+        return self._submit(start)
+
+    # ── Proxies ──────────────────────────────────────────────────────
 
     def _root_proxy(self):
-        return self._bus.get_proxy(SERVICE, OBJECT)
+        if self._root is None:
+            self._watch_owner()
+            self._root = self._bus.get_proxy(SERVICE, OBJECT)
+        return self._root
 
     def _controller_proxy(self, serial: str):
-        path = f"{CTRL_BASE}/{_serial_to_dbus_path(serial)}"
-        return self._bus.get_proxy(SERVICE, path)
+        proxy = self._controllers.get(serial)
+        if proxy is None:
+            self._watch_owner()
+            proxy = self._controllers[serial] = self._bus.get_proxy(SERVICE, _ctrl_path(serial))
+        return proxy
+
+    def _watch_owner(self) -> None:
+        """Subscribe (once) to NameOwnerChanged for the StreamController service."""
+        if self._owner_subscription is not None:
+            return
+        self._owner_subscription = self._bus.connection.signal_subscribe(
+            DBUS_SERVICE,
+            DBUS_SERVICE,
+            "NameOwnerChanged",
+            DBUS_PATH,
+            SERVICE,  # arg0: only changes for our service name
+            0,
+            self._on_name_owner_changed,
+        )
+
+    def _on_name_owner_changed(self, conn, sender, object_path, iface, signal, params):
+        self.forget_state()
+
+    def drop_proxies(self) -> None:
+        """Forget all cached proxies; they are recreated on next use."""
+        self._root = None
+        self._controllers.clear()
+
+    def forget_state(self) -> None:
+        """Forget cached proxies and mirrored properties (e.g. after a service restart)."""
+        self.drop_proxies()
+        with self._lock:
+            self._mirror.clear()
+
+    # ── State mirror ─────────────────────────────────────────────────
+
+    def _watch_state(self) -> None:
+        """Subscribe (once) to PropertiesChanged of the root interface."""
+        if self._state_subscription is not None:
+            return
+        self._state_subscription = self._bus.connection.signal_subscribe(
+            SERVICE,
+            "org.freedesktop.DBus.Properties",
+            "PropertiesChanged",
+            OBJECT,
+            IFACE,  # arg0: the interface whose properties changed
+            0,
+            self._on_state_changed,
+        )
+
+    def _on_state_changed(self, conn, sender, object_path, iface, signal, params):
+        _, changed, invalidated = params.unpack()
+        with self._lock:
+            for name in MIRRORED_PROPERTIES:
+                if name in changed:
+                    self._mirror[name] = list(changed[name])
+                elif name in invalidated:
+                    self._mirror.pop(name, None)
+
+    def _mirrored(self, name: str) -> Future:
+        """Read a mirrored root property, from memory when it has been loaded."""
+        with self._lock:
+            value = self._mirror.get(name)
+        if value is not None:
+            future: Future = Future()
+            future.set_result(list(value))
+            return future
+
+        def store(value: list[str]) -> None:
+            with self._lock:
+                self._mirror[name] = list(value)
+
+        # Subscribe before reading: the bus delivers in order, so no change
+        # after the Get can be missed, and any before it is older than the reply.
+        return self._get(OBJECT, IFACE, name, list, on_value=store, before=self._watch_state)
+
+    def _mirror_pages(self, add: str | None = None, remove: str | None = None):
+        """Return a callback applying our own page change to the mirror."""
+
+        def apply() -> None:
+            with self._lock:
+                pages = self._mirror.get("Pages")
+                if pages is None:
+                    return
+                if remove is not None and remove in pages:
+                    pages.remove(remove)
+                if add is not None and add not in pages:
+                    pages.append(add)
+
+        return apply
+
+    # ── Top-level operations ─────────────────────────────────────────
+
+    def get_controllers(self) -> Future:
+        """Resolve to the serial numbers of all connected controllers."""
+        return self._mirrored("Controllers")
+
+    def get_pages(self) -> Future:
+        """Resolve to a list of page names."""
+        return self._mirrored("Pages")
+
+    def add_page(self, name: str, json_contents: str = "") -> Future:
+        """Add a new page with the given name and optional JSON contents."""
+        return self._call(
+            self._root_proxy,
+            "AddPage",
+            name,
+            json_contents,
+            on_success=self._mirror_pages(add=name),
+        )
+
+    def remove_page(self, name: str) -> Future:
+        """Remove the page with the given name."""
+        return self._call(
+            self._root_proxy, "RemovePage", name, on_success=self._mirror_pages(remove=name)
+        )
+
+    def notify_foreground(self, window_name: str, window_class: str) -> Future:
+        """Notify StreamController of the current foreground window."""
+        return self._call(self._root_proxy, "NotifyForegroundWindow", window_name, window_class)
+
+    def get_data_path(self) -> Future:
+        """Resolve to the base data path used by StreamController."""
+        return self._get(OBJECT, IFACE, "DataPath", str)
+
+    def get_icon_packs(self) -> Future:
+        """Resolve to a list of icon pack IDs."""
+        return self._get(OBJECT, IFACE, "IconPacks", list)
+
+    def get_icon_names(self, pack_id: str, timeout: int | None = None) -> Future:
+        """Resolve to a list of icon names in the given pack.
+
+        *timeout* is an optional DBus call timeout in milliseconds.
+        """
+        return self._call(self._root_proxy, "GetIconNames", pack_id, timeout=timeout, convert=list)
+
+    def get_property(self, name: str) -> Future:
+        """Read a top-level property by name."""
+        return self._get(OBJECT, IFACE, name)
+
+    def push_pages(
+        self,
+        pages: list[tuple[str, str]],
+        *,
+        replace: bool = False,
+        existing: Collection[str] = (),
+        max_in_flight: int = MAX_PUSHES_IN_FLIGHT,
+    ) -> Future:
+        """Add many pages without waiting for each reply.
+
+        Up to *max_in_flight* pages are pushed concurrently.  With *replace*,
+        pages named in *existing* are removed before being added (and added
+        anyway if that removal fails, as *existing* may be out of date), and
+        any other page that turns out to exist (``PageExists``) is removed
+        and re-added.  If a name occurs more than once, only its last entry
+        is pushed.
+
+        Resolves to a dict mapping each page name to *None* on success or
+        the exception that page failed with.
+        """
+        done: Future = Future()
+        outcomes: dict[str, BaseException | None] = {}
+        batch = dict(pages)
+        queue = iter(batch.items())
+        lock = threading.Lock()
+
+        if not batch:
+            done.set_result(outcomes)
+            return done
+
+        def fail(exc: BaseException) -> None:
+            # Callbacks run inside Future machinery, which would swallow this
+            with lock:
+                if done.done():
+                    return
+                done.set_exception(exc)
+
+        def start_next():
+            try:
+                with lock:
+                    item = next(queue, None)
+                if item is None:
+                    return
+                name, json_contents = item
+                push = self._push_page(name, json_contents, replace, name in existing)
+                push.add_done_callback(lambda f: finished(name, f))
+            except Exception as exc:
+                fail(exc)
+
+        def finished(name: str, future: Future):
+            try:
+                with lock:
+                    outcomes[name] = future.exception()
+                    complete = len(outcomes) == len(batch) and not done.done()
+                    if complete:
+                        done.set_result(outcomes)
+                if not complete:
+                    start_next()
+            except Exception as exc:
+                fail(exc)
+
+        for _ in range(min(max_in_flight, len(batch))):
+            start_next()
+        return done
+
+    def _push_page(self, name: str, json_contents: str, replace: bool, exists: bool) -> Future:
+        """Add (or with *replace*, remove and re-add) one page, chaining the calls."""
+        result: Future = Future()
+
+        def relay(future: Future):
+            if future.exception() is not None:
+                result.set_exception(future.exception())
+            else:
+                result.set_result(None)
+
+        def after_add(future: Future):
+            exc = future.exception()
+            if replace and exc is not None and "PageExists" in str(exc):
+                self.remove_page(name).add_done_callback(after_remove)
+            else:
+                relay(future)
+
+        def after_remove(future: Future):
+            # Add even if the removal failed: most likely the page was already
+            # gone (*existing* was stale), and if not, AddPage reports why.
+            self.add_page(name, json_contents).add_done_callback(relay)
+
+        if replace and exists:
+            self.remove_page(name).add_done_callback(after_remove)
+        else:
+            self.add_page(name, json_contents).add_done_callback(after_add)
+        return result
+
+    # ── Per-controller operations ────────────────────────────────────
+
+    def set_active_page(self, serial: str, name: str) -> Future:
+        """Set the active page on the given controller."""
+        return self._call(lambda: self._controller_proxy(serial), "SetActivePage", name)
+
+    def get_controller_property(self, serial: str, name: str) -> Future:
+        """Read a property from a specific controller."""
+        return self._get(_ctrl_path(serial), CTRL_IFACE, name)
+
+
+class StreamControllerClient:
+    """Blocking client for the StreamController DBus API.
+
+    A thin wrapper that waits on the futures of an
+    :class:`AsyncStreamControllerClient` sharing the same bus connection.
+    """
+
+    def __init__(self):
+        self._async = AsyncStreamControllerClient()
+        self._bus = self._async.bus
+
+    @property
+    def async_client(self) -> AsyncStreamControllerClient:
+        """The non-blocking client this one wraps."""
+        return self._async
+
+    def drop_proxies(self) -> None:
+        """Forget all cached proxies; they are recreated on next use."""
+        self._async.drop_proxies()
+
+    def forget_state(self) -> None:
+        """Forget cached proxies and mirrored properties (e.g. after a service restart)."""
+        self._async.forget_state()
 
     # ── Top-level operations ─────────────────────────────────────────
 
     def get_controllers(self) -> list[str]:
         """Return serial numbers of all connected controllers."""
-        return list(self._root_proxy().Controllers)
+        return self._async.get_controllers().result()
 
     def get_pages(self) -> list[str]:
         """Return a list of page names."""
-        return list(self._root_proxy().Pages)
+        return self._async.get_pages().result()
 
     def add_page(self, name: str, json_contents: str = "") -> None:
         """Add a new page with the given name and optional JSON contents."""
-        self._root_proxy().AddPage(name, json_contents)
+        self._async.add_page(name, json_contents).result()
 
     def remove_page(self, name: str) -> None:
         """Remove the page with the given name."""
-        self._root_proxy().RemovePage(name)
+        self._async.remove_page(name).result()
 
     def notify_foreground(self, window_name: str, window_class: str) -> None:
         """Notify StreamController of the current foreground window."""
-        self._root_proxy().NotifyForegroundWindow(window_name, window_class)
+        self._async.notify_foreground(window_name, window_class).result()
 
     def get_data_path(self) -> str:
         """Return the base data path used by StreamController."""
-        return str(self._root_proxy().DataPath)
+        return self._async.get_data_path().result()
 
     def get_icon_packs(self) -> list[str]:
         """Return a list of icon pack IDs."""
-        return list(self._root_proxy().IconPacks)
+        return self._async.get_icon_packs().result()
 
-    def get_icon_names(self, pack_id: str) -> list[str]:
-        """Return a list of icon names in the given pack."""
-        return list(self._root_proxy().GetIconNames(pack_id))
+    def get_icon_names(self, pack_id: str, timeout: int | None = None) -> list[str]:
+        """Return a list of icon names in the given pack.
+
+        *timeout* is an optional DBus call timeout in milliseconds.
+        """
+        return self._async.get_icon_names(pack_id, timeout=timeout).result()
 
     def get_property(self, name: str) -> object:
         """Read a top-level property by name."""
-        return getattr(self._root_proxy(), name)
+        return self._async.get_property(name).result()
+
+    def push_pages(
+        self,
+        pages: list[tuple[str, str]],
+        *,
+        replace: bool = False,
+        existing: Collection[str] = (),
+        max_in_flight: int = MAX_PUSHES_IN_FLIGHT,
+    ) -> dict[str, BaseException | None]:
+        """Add many pages with pipelined calls.
+
+        See :meth:`AsyncStreamControllerClient.push_pages`; returns its outcome dict.
+        """
+        return self._async.push_pages(
+            pages, replace=replace, existing=existing, max_in_flight=max_in_flight
+        ).result()
 
     # ── Per-controller operations ────────────────────────────────────
 
     def set_active_page(self, serial: str, name: str) -> None:
         """Set the active page on the given controller."""
-        self._controller_proxy(serial).SetActivePage(name)
+        self._async.set_active_page(serial, name).result()
 
     def get_controller_property(self, serial: str, name: str) -> object:
         """Read a property from a specific controller."""
-        return getattr(self._controller_proxy(serial), name)
+        return self._async.get_controller_property(serial, name).result()
 
     # ── Listener ─────────────────────────────────────────────────────
 
-    def listen(self, callback=None):
+    def listen(
+        self,
+        callback=None,
+        *,
+        paths: Iterable[str | None] = (None,),
+        interfaces: Iterable[str | None] = (None,),
+        properties: Collection[str] | None = None,
+        on_owner_changed=None,
+    ):
         """
         Listen for PropertiesChanged signals. Blocks until interrupted.
 
         callback(object_path, interface, property_name, value) is called
         for each change.  If callback is None, changes are printed to stdout.
+
+        The subscription can be narrowed so the bus only delivers what the
+        caller needs: one match rule is added per combination of *paths*
+        (``None`` = every object of the service) and *interfaces* (matched
+        against the signal's first argument, ``None`` = any).  *properties*,
+        if given, drops other property names before *callback* is invoked
+        (DBus match rules cannot look inside the changed-properties dict).
+
+        on_owner_changed(new_owner), if given, is called on this loop when
+        the StreamController service disappears (``new_owner == ""``) or
+        (re)appears.  Subscriptions are made against the well-known service
+        name, so they keep working across a restart without resubscribing.
         """
+        from gi.repository import GLib
+
         connection = self._bus.connection
 
         def _default_callback(object_path, iface, prop, value):
@@ -123,32 +596,197 @@ class StreamControllerClient:
             print(f"{prefix} {iface} {prop} = {value!r}")
 
         cb = callback or _default_callback
+        wanted = frozenset(properties) if properties is not None else None
 
         def on_signal(conn, sender, object_path, iface, signal, params):
             sig_iface, changed, invalidated = params.unpack()
             for prop, value in changed.items():
-                cb(object_path, sig_iface, prop, value)
+                if wanted is None or prop in wanted:
+                    cb(object_path, sig_iface, prop, value)
             for prop in invalidated:
-                cb(object_path, sig_iface, prop, None)
+                if wanted is None or prop in wanted:
+                    cb(object_path, sig_iface, prop, None)
+
+        for path in paths:
+            for interface in interfaces:
+                connection.signal_subscribe(
+                    SERVICE,
+                    "org.freedesktop.DBus.Properties",
+                    "PropertiesChanged",
+                    path,
+                    interface,  # arg0
+                    0,
+                    on_signal,
+                )
+
+        if on_owner_changed is not None:
+
+            def on_owner_signal(conn, sender, object_path, iface, signal, params):
+                _, _, new_owner = params.unpack()
+                on_owner_changed(new_owner)
 
-        # Subscribe on root and all sub-objects
-        for path in (OBJECT, None):
             connection.signal_subscribe(
-                SERVICE,
-                "org.freedesktop.DBus.Properties",
-                "PropertiesChanged",
-                path,
-                None,
+                DBUS_SERVICE,
+                DBUS_SERVICE,
+                "NameOwnerChanged",
+                DBUS_PATH,
+                SERVICE,  # arg0: only changes for our service name
                 0,
-                on_signal,
+                on_owner_signal,
             )
 
-        print(f"Listening for property changes on {SERVICE} …  (Ctrl+C to stop)")
+        # Status goes to stderr so stdout carries only the change stream
+        print(f"Listening for property changes on {SERVICE} …  (Ctrl+C to stop)", file=sys.stderr)
         loop = GLib.MainLoop()
         try:
             loop.run()
         except KeyboardInterrupt:
-            print("\nStopped.")
+            print("\nStopped.", file=sys.stderr)
+
+
+def json_lines_callback(out=None):
+    """Return a listen() callback writing one JSON object per change to *out*.
+
+    Each line holds ``timestamp`` (Unix seconds), ``path``, ``interface``,
+    ``property`` and ``value``, and is flushed as soon as it is written.
+    """
+    out = out or sys.stdout
+
+    def emit(object_path, iface, prop, value):
+        record = {
+            "timestamp": time.time(),
+            "path": object_path,
+            "interface": iface,
+            "property": prop,
+            "value": value,
+        }
+        out.write(json.dumps(record, default=str) + "\n")
+        out.flush()
+
+    return emit
+
+
+# ── Benchmark ────────────────────────────────────────────────────────
+
+
+def _synthetic_page(keys: int) -> str:
+    """Return page JSON with *keys* labelled buttons, for timing page pushes."""
+    page = {"settings": {}, "keys": {}}
+    for i in range(keys):
+        page["keys"][f"{i % 8}x{i // 8}"] = {
+            "states": {
+                "0": {
+                    "actions": [{"id": "com_core447_OSPlugin::Hotkey", "settings": {}}],
+                    "labels": {"bottom": {"text": f"Key {i}"}},
+                    "media": {"size": 0.84},
+                }
+            }
+        }
+    return json.dumps(page)
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, math.ceil(len(ordered) * pct / 100))
+    return ordered[rank - 1]
+
+
+def _summarize(samples: list[float], errors: int) -> dict:
+    """Latency statistics in milliseconds for one benchmarked operation."""
+    summary: dict = {"count": len(samples), "errors": errors}
+    if samples:
+        ordered = sorted(samples)
+        summary.update(
+            min_ms=ordered[0],
+            p50_ms=_percentile(ordered, 50),
+            p95_ms=_percentile(ordered, 95),
+            p99_ms=_percentile(ordered, 99),
+            max_ms=ordered[-1],
+            mean_ms=sum(ordered) / len(ordered),
+        )
+    return summary
+
+
+def run_bench(
+    client: StreamControllerClient,
+    *,
+    iterations: int = 100,
+    page_size: int = 15,
+    warmup: int = 1,
+) -> dict:
+    """Time DBus round trips for each operation autopage relies on.
+
+    Calls are made on the async client and timed from issuing the call to
+    its future resolving on the loop thread, so the sync wrapper's hand-off
+    back to the caller is not counted.  Property reads go through
+    ``get_property`` so they always hit the bus, never the local mirror.
+    Each operation first runs *warmup* untimed times so proxy creation and
+    introspection are not counted.  Failed calls are counted as errors and
+    left out of the latency figures.
+    """
+    calls = client.async_client
+    results: dict[str, dict] = {}
+
+    def timed(op) -> float:
+        finished = threading.Event()
+        end = 0.0
+
+        def done(_future: Future) -> None:
+            nonlocal end
+            end = time.perf_counter()
+            finished.set()
+
+        start = time.perf_counter()
+        future = op()
+        future.add_done_callback(done)
+        finished.wait()
+        future.result()
+        return (end - start) * 1000
+
+    def measure(*steps) -> None:
+        """Run the ``(label, op)`` *steps* in order each round, timing each call on its own."""
+        samples: dict[str, list[float]] = {label: [] for label, _ in steps}
+        errors = dict.fromkeys(samples, 0)
+        for i in range(warmup + iterations):
+            for label, op in steps:
+                try:
+                    elapsed = timed(op)
+                except Exception:
+                    if i >= warmup:
+                        errors[label] += 1
+                    continue
+                if i >= warmup:
+                    samples[label].append(elapsed)
+        for label in samples:
+            results[label] = _summarize(samples[label], errors[label])
+
+    for prop in ("Pages", "Controllers"):
+        measure((f"get {prop}", lambda prop=prop: calls.get_property(prop)))
+
+    for pack_id in client.get_icon_packs():
+        measure((f"GetIconNames {pack_id}", lambda p=pack_id: calls.get_icon_names(p)))
+
+    name = f"streamclient-bench-{os.getpid()}"
+    page_json = _synthetic_page(page_size)
+    measure(
+        ("AddPage", lambda: calls.add_page(name, page_json)),
+        ("RemovePage", lambda: calls.remove_page(name)),
+    )
+
+    controllers = client.get_controllers()
+    if controllers:
+        client.add_page(name, page_json)
+        try:
+            measure(("SetActivePage", lambda: calls.set_active_page(controllers[0], name)))
+        finally:
+            client.remove_page(name)
+
+    return {
+        "iterations": iterations,
+        "page_size": page_size,
+        "page_bytes": len(page_json),
+        "results": results,
+    }
 
 
 # ── CLI ──────────────────────────────────────────────────────────────
@@ -190,11 +828,207 @@ def build_parser():
     )
     p.add_argument("property_name", help="Property name (Controllers, Pages, ActivePageName, …)")
 
-    sub.add_parser("listen", help="Listen for property change notifications")
+    p = sub.add_parser("listen", help="Listen for property change notifications")
+    p.add_argument("--json", action="store_true", help="Write one JSON object per change")
+    p.add_argument(
+        "--path",
+        action="append",
+        dest="paths",
+        metavar="OBJECT_PATH",
+        help="Only changes on this object, matched by the bus (repeatable)",
+    )
+    p.add_argument(
+        "--property",
+        action="append",
+        dest="properties",
+        metavar="NAME",
+        help="Only changes to this property, filtered client-side (repeatable)",
+    )
+
+    p = sub.add_parser("bench", help="Measure DBus round-trip latency, printed as JSON")
+    p.add_argument("-n", "--iterations", type=int, default=100, help="Timed calls per operation")
+    p.add_argument(
+        "--page-size", type=int, default=15, help="Buttons on the synthetic page (default: 15)"
+    )
+    p.add_argument("--warmup", type=int, default=1, help="Untimed calls per operation first")
+
+    p = sub.add_parser(
+        "batch", help="Run commands (one per line, or JSON lines) over one connection"
+    )
+    p.add_argument("file", nargs="?", default="-", help="Script file (default: stdin)")
+    p.add_argument("--stop-on-error", action="store_true", help="Stop at the first failing command")
 
     return parser
 
 
+def execute(client: StreamControllerClient, args) -> object:
+    """Run one parsed (non-listening) command and return its result as plain data."""
+    if args.command == "controllers":
+        return client.get_controllers()
+    if args.command == "pages":
+        return client.get_pages()
+    if args.command == "add-page":
+        client.add_page(args.name, args.json or "")
+        return None
+    if args.command == "remove-page":
+        client.remove_page(args.name)
+        return None
+    if args.command == "set-active-page":
+        client.set_active_page(args.serial, args.name)
+        return None
+    if args.command == "notify-foreground":
+        client.notify_foreground(args.window_name, args.window_class)
+        return None
+    if args.command == "icon-packs":
+        return client.get_icon_packs()
+    if args.command == "icons":
+        return client.get_icon_names(args.pack_id)
+    if args.command == "get-property":
+        if args.serial:
+            return client.get_controller_property(args.serial, args.property_name)
+        return client.get_property(args.property_name)
+    if args.command == "bench":
+        return run_bench(
+            client, iterations=args.iterations, page_size=args.page_size, warmup=args.warmup
+        )
+    raise ValueError(f"Command {args.command!r} cannot be run here")
+
+
+def _print_result(args, result) -> None:
+    """Print the human-readable output of a command run by :func:`execute`."""
+    if args.command == "controllers":
+        for s in result:
+            print(s)
+
+    elif args.command == "pages":
+        if not result:
+            print("No pages found.")
+        else:
+            for p in result:
+                print(p)
+
+    elif args.command == "add-page":
+        print(f"Added page: {args.name}")
+
+    elif args.command == "remove-page":
+        print(f"Removed page: {args.name}")
+
+    elif args.command == "set-active-page":
+        print(f"Set active page: {args.name}")
+
+    elif args.command == "notify-foreground":
+        print(f"Notified foreground window: name={args.window_name!r} class={args.window_class!r}")
+
+    elif args.command == "icon-packs":
+        if not result:
+            print("No icon packs found.")
+        else:
+            for p in result:
+                print(p)
+
+    elif args.command == "icons":
+        if not result:
+            print(f"No icons found in pack: {args.pack_id}")
+        else:
+            for icon in result:
+                print(icon)
+
+    elif args.command == "get-property":
+        print(f"{args.property_name} = {result!r}")
+
+    elif args.command == "bench":
+        print(json.dumps(result, indent=2))
+
+
+def _batch_arg(value) -> str:
+    """Turn one JSON request argument into its command-line form.
+
+    ``null`` stands for an empty argument (no template, no window class),
+    strings pass through, and anything else (a page given as an object,
+    a number) is written back out as JSON.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _batch_argv(line: str) -> tuple[list[str], object]:
+    """Split one batch line into CLI arguments and the caller's optional ``id``.
+
+    A line is either a command as typed on the command line, or a JSON
+    object ``{"command": ..., "args": [...], "id": ...}``.
+    """
+    if line.startswith("{"):
+        request = json.loads(line)
+        if not isinstance(request, dict) or "command" not in request:
+            raise ValueError('JSON requests need a "command" field')
+        args = request.get("args", [])
+        if not isinstance(args, list):
+            raise ValueError('"args" must be a list')
+        return [request["command"], *map(_batch_arg, args)], request.get("id")
+    return shlex.split(line), None
+
+
+def _parse_batch_args(parser: argparse.ArgumentParser, argv: list[str]) -> argparse.Namespace:
+    """Parse one batch command without letting argparse write to stdout or stderr.
+
+    ``--help`` and usage errors would otherwise print into the JSON-line
+    stream (or exit); they become this line's error instead.
+    """
+    captured = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured):
+            return parser.parse_args(argv)
+    except SystemExit as e:
+        if e.code == 0:
+            raise ValueError("Help is not available in batch mode") from None
+        lines = captured.getvalue().strip().splitlines()
+        raise ValueError(lines[-1] if lines else "Invalid command") from None
+
+
+def run_batch(
+    client: StreamControllerClient, lines: Iterable[str], out=None, *, stop_on_error: bool = False
+) -> bool:
+    """Run newline-delimited commands over one client, streaming JSON-line results.
+
+    Every non-blank, non-comment line yields one JSON object on *out*
+    (default stdout), flushed immediately: ``{"line", "command", "ok",
+    "result" | "error"}``, plus ``"id"`` when the request carried one.
+    Returns *True* if every command succeeded.
+    """
+    out = out or sys.stdout
+    parser = build_parser()
+    all_ok = True
+
+    for lineno, raw in enumerate(lines, start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        record: dict = {"line": lineno}
+        try:
+            argv, request_id = _batch_argv(line)
+            if request_id is not None:
+                record["id"] = request_id
+            args = _parse_batch_args(parser, argv)
+            record["command"] = args.command
+            if args.command in (None, "listen", "batch"):
+                raise ValueError(f"Command {args.command!r} is not available in batch mode")
+            record.update(ok=True, result=execute(client, args))
+        except Exception as e:
+            record.update(ok=False, error=str(e))
+            all_ok = False
+
+        out.write(json.dumps(record, default=list) + "\n")
+        out.flush()
+        if stop_on_error and not record["ok"]:
+            break
+
+    return all_ok
+
+
 def main():
     parser = build_parser()
     args = parser.parse_args()
@@ -206,61 +1040,24 @@ def main():
     client = get_client()
 
     try:
-        if args.command == "controllers":
-            for s in client.get_controllers():
-                print(s)
-
-        elif args.command == "pages":
-            pages = client.get_pages()
-            if not pages:
-                print("No pages found.")
-            else:
-                for p in pages:
-                    print(p)
-
-        elif args.command == "add-page":
-            client.add_page(args.name, args.json or "")
-            print(f"Added page: {args.name}")
-
-        elif args.command == "remove-page":
-            client.remove_page(args.name)
-            print(f"Removed page: {args.name}")
-
-        elif args.command == "set-active-page":
-            client.set_active_page(args.serial, args.name)
-            print(f"Set active page: {args.name}")
-
-        elif args.command == "notify-foreground":
-            client.notify_foreground(args.window_name, args.window_class)
-            print(
-                f"Notified foreground window: name={args.window_name!r} class={args.window_class!r}"
+        if args.command == "listen":
+            client.listen(
+                json_lines_callback() if args.json else None,
+                paths=args.paths or (None,),
+                properties=args.properties,
             )
 
-        elif args.command == "icon-packs":
-            packs = client.get_icon_packs()
-            if not packs:
-                print("No icon packs found.")
-            else:
-                for p in packs:
-                    print(p)
-
-        elif args.command == "icons":
-            icons = client.get_icon_names(args.pack_id)
-            if not icons:
-                print(f"No icons found in pack: {args.pack_id}")
-            else:
-                for icon in icons:
-                    print(icon)
-
-        elif args.command == "get-property":
-            if args.serial:
-                value = client.get_controller_property(args.serial, args.property_name)
+        elif args.command == "batch":
+            if args.file == "-":
+                ok = run_batch(client, sys.stdin, stop_on_error=args.stop_on_error)
             else:
-                value = client.get_property(args.property_name)
-            print(f"{args.property_name} = {value!r}")
+                with open(args.file, encoding="utf-8") as f:
+                    ok = run_batch(client, f, stop_on_error=args.stop_on_error)
+            if not ok:
+                sys.exit(1)
 
-        elif args.command == "listen":
-            client.listen()
+        else:
+            _print_result(args, execute(client, args))
 
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
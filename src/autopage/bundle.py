@@ -0,0 +1,153 @@
+"""Precompiled recipe bundle.
+
+``autopage --compile`` discovers every recipe once and writes the parsed
+:class:`~autopage.toml.AutopageDef`\\ s (match rules included) to a single
+versioned JSON file under ``$XDG_CACHE_HOME/autopage``.  The bundle records
+the content digest of every config it was built from; later runs re-read
+those sources, compare digests, and use the bundle instead of parsing
+TOML when nothing has changed.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from autopage.cache import cache_path, load_json, save_json
+from autopage.recipes import (
+    DISCOVERY_WORKERS,
+    RecipeCache,
+    config_url,
+    content_digest,
+    fetch_text,
+)
+from autopage.toml import Action, AutopageDef, Button, MatchRule
+
+log = logging.getLogger(__name__)
+
+# Bump whenever the bundle layout or the AutopageDef model changes.
+BUNDLE_VERSION = 1
+
+
+class CompiledRecipe(NamedTuple):
+    """A recipe loaded from the bundle, standing in for a toml-repo Repo.
+
+    Has ``url`` like a Repo, but no ``config``: call :meth:`to_definition`
+    for a fresh, already-parsed definition instead.
+    """
+
+    url: str
+    digest: str
+    definition: dict
+
+    def to_definition(self) -> AutopageDef:
+        """Build a new AutopageDef (callers may mutate it, e.g. resolving icons)."""
+        return _definition_from_dict(self.definition)
+
+
+# ── (De)serialization ────────────────────────────────────────────────
+
+
+def _plain(value):
+    """json.dumps fallback for tomlkit items that are not plain Python types."""
+    unwrap = getattr(value, "unwrap", None)
+    if unwrap is not None:
+        return unwrap()
+    raise TypeError(f"Cannot serialize {type(value).__name__} in a recipe bundle")
+
+
+def _definition_from_dict(data: dict) -> AutopageDef:
+    buttons = []
+    for b in data["buttons"]:
+        fields = {k: v for k, v in b.items() if k != "actions"}
+        buttons.append(Button(**fields, actions=[Action(**a) for a in b["actions"]]))
+    return AutopageDef(
+        matches=[MatchRule(**m) for m in data["matches"]],
+        defaults=data["defaults"],
+        buttons=buttons,
+        source_path=data["source_path"],
+    )
+
+
+# ── Writing and loading ──────────────────────────────────────────────
+
+
+def write_bundle(
+    base_url: str,
+    recipes: list[tuple[str, AutopageDef]],
+    sources: dict[str, str],
+    path: Path | None = None,
+) -> Path:
+    """Atomically write a bundle of ``(url, definition)`` pairs.
+
+    *sources* maps the URL of every file the recipes were discovered from
+    to its content digest; it decides whether the bundle is current.
+    """
+    path = path or cache_path("bundle.json")
+    doc = {
+        "version": BUNDLE_VERSION,
+        "base_url": base_url,
+        "sources": dict(sorted(sources.items())),
+        "recipes": [
+            {
+                "url": url,
+                "digest": sources.get(config_url(url), ""),
+                "definition": dataclasses.asdict(d),
+            }
+            for url, d in recipes
+        ],
+    }
+    save_json(path, doc, default=_plain)
+    return path
+
+
+def load_bundle(
+    base_url: str,
+    *,
+    workers: int = DISCOVERY_WORKERS,
+    cache: RecipeCache | None = None,
+    path: Path | None = None,
+    texts: dict[str, str] | None = None,
+) -> list[CompiledRecipe] | None:
+    """Return the bundled recipes for *base_url*, or *None* if not up to date.
+
+    Every source config is re-read (through *cache* without revalidation
+    when one is given, otherwise from its URL, *workers* at a time) and
+    its digest compared; any difference, missing source or unreadable
+    bundle means *None*, and the caller should discover recipes normally.
+    If *texts* is given, it is filled with every source text read, so that
+    discovery need not fetch them again.
+    """
+    path = path or cache_path("bundle.json")
+    doc = load_json(path, BUNDLE_VERSION, "recipe bundle")
+    if doc is None:
+        return None
+    if doc.get("base_url") != base_url:
+        log.debug("Recipe bundle %s was built from %s, not %s", path, doc.get("base_url"), base_url)
+        return None
+
+    sources: dict[str, str] = doc.get("sources", {})
+
+    def current_digest(url: str) -> str | None:
+        try:
+            text = fetch_text(url, cache=cache, revalidate=cache is None)
+        except Exception as exc:
+            log.debug("Could not re-read %s: %s", url, exc)
+            return None
+        if texts is not None:
+            texts[url] = text
+        return content_digest(text)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sources) or 1))) as pool:
+        current = dict(zip(sources, pool.map(current_digest, sources)))
+    changed = [url for url, digest in sources.items() if current[url] != digest]
+    if changed:
+        log.info(
+            "Recipe bundle is out of date (%d source(s) changed), re-run --compile", len(changed)
+        )
+        return None
+
+    return [CompiledRecipe(r["url"], r["digest"], r["definition"]) for r in doc["recipes"]]
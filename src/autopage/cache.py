@@ -0,0 +1,72 @@
+"""Versioned JSON files under ``$XDG_CACHE_HOME/autopage``.
+
+The icon cache, the recipe cache, the recipe bundle and the pushed-page
+hashes are each a single JSON object carrying a ``version`` number.  A file
+written by another version (or that cannot be read) is ignored rather than
+migrated; bump a file's version whenever its layout changes.
+
+Files are replaced atomically through a uniquely named temporary file in
+the same directory, so processes saving at the same time (the listen daemon
+and a one-shot run, say) never write into each other's temporary file: the
+last rename wins and readers always see a complete file.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+
+def cache_path(name: str) -> Path:
+    """Return the location of cache file *name*."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return Path(base) / "autopage" / name
+
+
+def load_json(path: Path, version: int, what: str) -> dict | None:
+    """Read the JSON object at *path* if it was written with *version*.
+
+    Returns *None* if the file is missing, unreadable or from another
+    version; *what* names the file in log messages.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        log.warning("Ignoring unreadable %s %s: %s", what, path, exc)
+        return None
+
+    if not isinstance(doc, dict) or doc.get("version") != version:
+        log.debug("Ignoring %s %s with unknown version", what, path)
+        return None
+    return doc
+
+
+def save_json(path: Path, doc: dict, *, default=None) -> None:
+    """Atomically write *doc* to *path* as JSON.
+
+    *default* is passed on to :func:`json.dump`.  Errors are raised; the
+    temporary file is removed again if anything fails.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f".{path.name}.", delete=False
+    ) as f:
+        try:
+            json.dump(doc, f, default=default)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    try:
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
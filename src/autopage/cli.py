@@ -4,13 +4,6 @@ import argparse
 import logging
 import sys
 
-from autopage.engine import (
-    listen_and_autoswitch,
-    process_all_repos,
-    push_jsonpage,
-    toml_to_jsonpage,
-)
-
 
 def main(argv: list[str] | None = None) -> int:
     """Entry point for the autopage CLI."""
@@ -40,11 +33,41 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Replace the page if it already exists (remove then re-add)",
     )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Replace existing pages only if their JSON changed since autopage last pushed them",
+    )
     parser.add_argument(
         "--dev",
         action="store_true",
         help="Use local autopage-recipes directory instead of remote GitHub repo",
     )
+    parser.add_argument(
+        "--fetch-jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Fetch up to N recipes at once during discovery (default: 1, toml-repo's own walk)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Generate pages in N worker processes when processing all recipes (default: 1)",
+    )
+    parser.add_argument(
+        "--cached-recipes",
+        action="store_true",
+        help="Use cached recipes at once (works offline) and revalidate them in the background",
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Parse all discovered recipes into a bundle that later runs load while it is current",
+    )
     parser.add_argument(
         "--listen",
         action="store_true",
@@ -67,19 +90,50 @@ def main(argv: list[str] | None = None) -> int:
     )
 
     try:
-        if args.listen:
+        # Imported here, not at module level, so --help and --version don't
+        # pay for tomlkit and friends.
+        from autopage.engine import (
+            compile_recipes,
+            listen_and_autoswitch,
+            process_all_repos,
+            push_jsonpage,
+            toml_to_jsonpage,
+        )
+
+        if args.compile:
+            # Compile mode: discover and parse every recipe once, write the bundle
+            compile_recipes(dev=args.dev, fetch_jobs=args.fetch_jobs)
+        elif args.listen:
             # Listen mode: watch for foreground window changes, auto-push matching pages
-            listen_and_autoswitch(dev=args.dev, force=args.force)
+            listen_and_autoswitch(
+                dev=args.dev,
+                force=args.force,
+                fetch_jobs=args.fetch_jobs,
+                cached=args.cached_recipes,
+                sync=args.sync,
+            )
         elif args.source is not None:
             # Single-file mode
             page_name, page_json = toml_to_jsonpage(args.source)
             if args.dry_run:
                 print(page_json)
             else:
-                push_jsonpage(page_name, page_json, force=args.force)
+                from autopage.sync import PageHashes
+
+                hashes = PageHashes()
+                push_jsonpage(page_name, page_json, force=args.force, sync=args.sync, hashes=hashes)
+                hashes.save()
         else:
             # Discovery mode: use toml-repo to find all ap.toml files
-            process_all_repos(dev=args.dev, dry_run=args.dry_run, force=args.force)
+            process_all_repos(
+                dev=args.dev,
+                dry_run=args.dry_run,
+                force=args.force,
+                fetch_jobs=args.fetch_jobs,
+                cached=args.cached_recipes,
+                sync=args.sync,
+                jobs=args.jobs,
+            )
     except Exception as exc:
         logging.error("%s", exc)
         return 1
@@ -5,10 +5,13 @@ from __future__ import annotations
 import logging
 import os
 import re
+from collections.abc import Iterator
 from pathlib import Path
 from typing import NamedTuple
 
+from autopage.icons import IconCatalog, IconIndex, icon_media_path
 from autopage.json import generate_page_json, page_json_to_string
+from autopage.sync import PageHashes
 from autopage.toml import AutopageDef, parse_toml_dict, parse_toml_file
 
 log = logging.getLogger(__name__)
@@ -17,100 +20,109 @@ log = logging.getLogger(__name__)
 REMOTE_RECIPES_URL = "https://raw.githubusercontent.com/geeksville/autopage-recipes/refs/heads/main"
 # The kind tag used to identify autopage recipe repos
 AP_KIND = "ap"
+# Backoff (milliseconds) between resync attempts after StreamController restarts
+RESYNC_INITIAL_DELAY_MS = 500
+RESYNC_MAX_DELAY_MS = 30_000
 
 
 # ── Icon resolution ──────────────────────────────────────────────────
 
 
-def _build_icon_catalog(client=None) -> tuple[list[tuple[str, str]], str]:
-    """Fetch all icon packs and their icons from StreamController.
-
-    Args:
-        client: An optional ``StreamControllerClient`` instance.  When *None*
-                a new client is created (requires DBus).
-
-    Returns a tuple of (catalog, data_path) where catalog is a list of
-    ``(pack_id, icon_name)`` tuples and data_path is the base path
-    from the StreamController API.
-    """
-    if client is None:
-        from autopage.api_client import get_client
-
-        client = get_client()
-
-    data_path = "data"  # fallback
-    try:
-        data_path = client.get_data_path()
-    except Exception as exc:
-        log.warning("Could not fetch DataPath from StreamController: %s", exc)
-
-    catalog: list[tuple[str, str]] = []
-    try:
-        for pack_id in client.get_icon_packs():
-            log.debug("Fetching icons for pack %r", pack_id)
-            for icon_name in client.get_icon_names(pack_id):
-                catalog.append((pack_id, icon_name))
-        log.info(
-            "Icon catalog: %d icon(s) across %d pack(s)",
-            len(catalog),
-            len(set(p for p, _ in catalog)),
-        )
-    except Exception as exc:
-        log.warning("Could not fetch icon catalog from StreamController: %s", exc)
-
-    return catalog, data_path
-
-
 def _match_icon(
-    pattern: str, catalog: list[tuple[str, str]], data_path: str = "data"
+    pattern: str, catalog: IconIndex | list[tuple[str, str]], data_path: str = "data"
 ) -> str | None:
     """Match an icon regex against the catalog and return the media path.
 
     The *pattern* is treated as a regex and matched (case-insensitively)
-    against the icon name.  The first match wins.
+    against the icon name.  The first match in catalog order wins.
 
     Args:
         pattern: Regex to match against icon names.
-        catalog: List of (pack_id, icon_name) tuples.
+        catalog: An ``IconIndex`` or a list of (pack_id, icon_name) tuples.
         data_path: Base data path from the StreamController API.
     """
-    regex = re.compile(pattern, re.IGNORECASE)
+    index = catalog if isinstance(catalog, IconIndex) else IconIndex(catalog)
 
-    for pack_id, icon_name in catalog:
-        if regex.fullmatch(icon_name):
-            # Build the full media path expected by StreamController.
-            return os.path.join(data_path, "icons", pack_id, "icons", f"{icon_name}.png")
+    hit = index.match(pattern)
+    if hit is None:
+        return None
 
-    return None
+    # Build the full media path expected by StreamController.
+    pack_id, icon_name = hit
+    return icon_media_path(data_path, pack_id, icon_name)
 
 
-def _resolve_icons(definition: AutopageDef, *, client=None) -> None:
+def _resolve_icons(
+    definition: AutopageDef, *, client=None, icons: IconCatalog | None = None
+) -> set[str]:
     """Resolve icon patterns on all buttons using the StreamController API.
 
     Args:
         definition: The parsed autopage definition whose buttons will be updated
                     in-place.
         client: An optional ``StreamControllerClient`` instance (for testing).
+        icons: An optional run-scoped ``IconCatalog`` shared between recipes.
+               When *None* a one-off catalog is fetched for this definition.
 
     Buttons whose icon cannot be resolved will have the icon dropped.
+    Returns the set of patterns that were dropped.
+    """
+    return _resolve_icons_bulk([definition], client=client, icons=icons)
+
+
+def _resolve_icons_bulk(
+    definitions: list[AutopageDef], *, client=None, icons: IconCatalog | None = None
+) -> set[str]:
+    """Resolve the icon patterns of many definitions in a single pass.
+
+    Every distinct pattern across all *definitions* is resolved exactly
+    once (and memoized by *icons* across calls) and the result is applied
+    to every button that uses it.  Buttons whose icon cannot be resolved
+    (no match, or an invalid regex) will have the icon dropped.
+
+    Returns the set of patterns that were dropped.
     """
-    buttons_with_icons = [b for b in definition.buttons if b.icon]
+    buttons_with_icons = [b for d in definitions for b in d.buttons if b.icon]
     if not buttons_with_icons:
-        return
+        return set()
 
-    catalog, data_path = _build_icon_catalog(client)
-    if not catalog:
+    if icons is None:
+        icons = IconCatalog(client)
+    index, _ = icons.load_index()
+    if not index:
         log.info("Icon catalog is empty, skipping icon resolution")
-        return
+        return set()
 
+    resolved: dict[str, str | None] = {}
     for button in buttons_with_icons:
-        resolved = _match_icon(button.icon, catalog, data_path)
-        if resolved:
-            log.info("Resolved icon %r → %s", button.icon, resolved)
-            button.icon = resolved
-        else:
-            log.warning("No icon matched pattern %r, dropping...", button.icon)
-            button.icon = None
+        pattern = button.icon
+        if pattern not in resolved:
+            resolved[pattern] = _resolve_icon_pattern(pattern, icons)
+        button.icon = resolved[pattern]
+
+    log.debug(
+        "Resolved %d distinct icon pattern(s) for %d button(s) in %d definition(s)",
+        len(resolved),
+        len(buttons_with_icons),
+        len(definitions),
+    )
+    icons.log_cache_stats()
+    return {pattern for pattern, path in resolved.items() if path is None}
+
+
+def _resolve_icon_pattern(pattern: str, icons: IconCatalog) -> str | None:
+    """Resolve one icon pattern, logging the outcome; bad regexes count as no match."""
+    try:
+        resolved = icons.resolve(pattern)
+    except re.error as exc:
+        log.error("Bad icon regex %r: %s", pattern, exc)
+        return None
+
+    if resolved:
+        log.info("Resolved icon %r → %s", pattern, resolved)
+    else:
+        log.warning("No icon matched pattern %r, dropping...", pattern)
+    return resolved
 
 
 def _get_controller_serials() -> list[str]:
@@ -147,30 +159,43 @@ def toml_to_jsonpage(path: str | Path) -> tuple[str, str]:
     # Resolve icon regex patterns to real media paths
     _resolve_icons(definition)
 
-    # Fetch connected deck serial numbers for auto-change
-    decks = _get_controller_serials()
-
-    page = generate_page_json(definition, decks=decks)
-    page_json = page_json_to_string(page)
-
     # Derive a page name from the filename (strip .ap.toml suffix)
     page_name = path.stem
     if page_name.endswith(".ap"):
         page_name = page_name[: -len(".ap")]
 
-    log.info("Generated page %r with %d button(s)", page_name, len(definition.buttons))
+    return page_name, _definition_to_jsonpage(page_name, definition)
+
+
+def _definition_to_jsonpage(
+    page_name: str, definition: AutopageDef, decks: list[str] | None = None
+) -> str:
+    """Generate page JSON for a definition whose icons are already resolved.
+
+    *decks* are the controller serials for auto-change; fetched if not given.
+    """
+    if decks is None:
+        decks = _get_controller_serials()
+
+    page = generate_page_json(definition, decks=decks)
+    page_json = page_json_to_string(page)
 
-    return page_name, page_json
+    log.info("Generated page %r with %d button(s)", page_name, len(definition.buttons))
+    return page_json
 
 
 def _fetch_known_pages() -> set[str]:
-    """Read the current Pages list from StreamController and return as a set."""
+    """Read the current Pages list from StreamController and return as a set.
+
+    After the first call this is served from the client's local mirror of
+    ``Pages``, so it is cheap enough to call on every window change.
+    """
     from autopage.api_client import get_client
 
     try:
         client = get_client()
         pages = set(client.get_pages())
-        log.info("Known pages on controller: %s", pages)
+        log.debug("Known pages on controller: %s", pages)
         return pages
     except Exception as exc:
         log.warning("Could not fetch existing pages: %s", exc)
@@ -183,6 +208,8 @@ def push_jsonpage(
     *,
     force: bool = False,
     known_pages: set[str] | None = None,
+    sync: bool = False,
+    hashes: PageHashes | None = None,
 ) -> bool:
     """Push a JSON page definition to StreamController via DBus API.
 
@@ -196,56 +223,189 @@ def push_jsonpage(
                      If provided and *force* is False, pages that already
                      exist are skipped.  Newly pushed pages are added to
                      the set in-place.
+        sync: If *True*, a page that already exists is replaced only when
+              *page_json* differs from what *hashes* says was last pushed
+              (*known_pages* is fetched if not given).
+        hashes: Optional :class:`~autopage.sync.PageHashes` that the pushed
+                page is recorded in; the caller saves it.
 
     Returns:
         True if the page was actually pushed, False if it was skipped.
     """
+    if sync and known_pages is None:
+        known_pages = _fetch_known_pages()
+
     # Skip push if we already know the controller has this page
     if not force and known_pages is not None and page_name in known_pages:
-        log.info("Page %r already on controller, skipping (use --force to replace)", page_name)
-        return False
+        if not sync:
+            log.info("Page %r already on controller, skipping (use --force to replace)", page_name)
+            return False
+        if hashes is not None and hashes.unchanged(page_name, page_json):
+            log.info("Page %r unchanged on controller, skipping", page_name)
+            return False
+    replace = force or sync
 
     from autopage.api_client import get_client
 
     client = get_client()
-    try:
-        client.add_page(page_name, page_json)
-    except Exception as exc:
-        if force and "PageExists" in str(exc):
-            log.info("Page %r already exists, replacing (--force)", page_name)
+    if replace and known_pages is not None and page_name in known_pages:
+        # Known to exist: replace directly instead of failing an AddPage first
+        log.info("Page %r already exists, replacing", page_name)
+        try:
             client.remove_page(page_name)
+        except Exception as exc:
+            # known_pages was stale and the page is already gone; just add it
+            log.debug("Could not remove page %r (%s), adding it", page_name, exc)
+        client.add_page(page_name, page_json)
+    else:
+        try:
             client.add_page(page_name, page_json)
-        else:
-            raise
+        except Exception as exc:
+            if replace and "PageExists" in str(exc):
+                log.info("Page %r already exists, replacing", page_name)
+                client.remove_page(page_name)
+                client.add_page(page_name, page_json)
+            else:
+                raise
 
     if known_pages is not None:
         known_pages.add(page_name)
+    if hashes is not None:
+        hashes.record(page_name, page_json)
     log.info("Page %r pushed to StreamController", page_name)
     return True
 
 
-def _discover_ap_repos(dev: bool = False) -> list[object]:
-    """Use toml-repo to discover all ap.toml repos.
+def push_jsonpages(
+    pages: list[tuple[str, str]],
+    *,
+    force: bool = False,
+    known_pages: set[str] | None = None,
+    sync: bool = False,
+    hashes: PageHashes | None = None,
+) -> dict[str, Exception | None]:
+    """Push many JSON pages to StreamController with pipelined DBus calls.
 
-    Args:
-        dev: If True, use local ``file:autopage-recipes`` directory.
-             Otherwise use the remote GitHub URL.
+    Same rules as :func:`push_jsonpage`, but the ``AddPage``/``RemovePage``
+    calls for all pages are sent without waiting for each reply (with a
+    bounded number in flight) and the results are collected at the end.
+    If a page name occurs more than once, the first one is pushed, or the
+    last one with *force*.
 
     Returns:
-        A list of ``Repo`` objects whose kind is ``"ap"``.
+        A dict mapping each page that was pushed (not skipped) to *None* on
+        success or the exception it failed with.
     """
-    from toml_repo import RepoManager, set_config_suffix
+    known = known_pages if known_pages is not None else set()
+    batch: dict[str, str] = {}
+    unchanged = 0
+    for page_name, page_json in pages:
+        if not force and (page_name in known or page_name in batch):
+            if not sync or page_name in batch:
+                log.info(
+                    "Page %r already on controller, skipping (use --force to replace)", page_name
+                )
+                continue
+            if hashes is not None and hashes.unchanged(page_name, page_json):
+                log.debug("Page %r unchanged on controller, skipping", page_name)
+                unchanged += 1
+                continue
+        batch[page_name] = page_json
+
+    if unchanged:
+        log.info("%d page(s) unchanged on controller, skipping", unchanged)
+    if not batch:
+        return {}
 
-    set_config_suffix("ap.toml")
+    from autopage.api_client import get_client
+
+    log.info("Pushing %d page(s) to StreamController", len(batch))
+    outcomes = get_client().push_pages(list(batch.items()), replace=force or sync, existing=known)
+
+    for page_name, exc in outcomes.items():
+        if exc is None:
+            if known_pages is not None:
+                known_pages.add(page_name)
+            if hashes is not None:
+                hashes.record(page_name, batch[page_name])
+            log.info("Page %r pushed to StreamController", page_name)
+    return outcomes
 
+
+def _recipes_base_url(dev: bool) -> str:
+    """Return the URL of the recipe index (local ``autopage-recipes`` with *dev*)."""
     if dev:
         # Resolve the local autopage-recipes directory relative to cwd
         local_path = Path("autopage-recipes").resolve()
-        base_url = f"file://{local_path}"
-    else:
-        base_url = REMOTE_RECIPES_URL
+        return f"file://{local_path}"
+    return REMOTE_RECIPES_URL
+
+
+def _discover_ap_repos(
+    dev: bool = False, fetch_jobs: int = 1, cached: bool = False
+) -> list[object]:
+    """Use toml-repo to discover all ap.toml repos.
+
+    If a compiled bundle (see :func:`compile_recipes`) exists for the index
+    and its sources are unchanged, its pre-parsed recipes are returned
+    instead and nothing is parsed.  If it is out of date, the index is
+    walked by :func:`autopage.recipes.discover_recipes`, reusing the files
+    the freshness check already read.
+
+    Args:
+        dev: If True, use local ``file:autopage-recipes`` directory.
+             Otherwise use the remote GitHub URL.
+        fetch_jobs: If greater than 1, walk the index with
+             :func:`autopage.recipes.discover_recipes`, fetching up to this
+             many recipes at once, instead of toml-repo's sequential walk.
+        cached: Start from the local recipe cache (remote index only) and
+             revalidate it in the background; implies autopage's own walk.
+
+    Returns:
+        A list of ``Repo``-like objects (with ``url`` and ``config``, or
+        :class:`~autopage.bundle.CompiledRecipe`) whose kind is ``"ap"``,
+        in index order.
+    """
+    from autopage.bundle import load_bundle
+    from autopage.recipes import RecipeCache
+
+    base_url = _recipes_base_url(dev)
     log.info("Discovering repos from %s (dev=%s)", base_url, dev)
+    cache = RecipeCache() if cached and not dev else None
+
+    texts: dict[str, str] = {}
+    bundled = load_bundle(base_url, cache=cache, texts=texts)
+    if bundled is not None:
+        log.info("Loaded %d repo(s) of kind %r from compiled bundle", len(bundled), AP_KIND)
+        if cache is not None and cache.stale:
+            from autopage.recipes import revalidate_in_background
 
+            revalidate_in_background(base_url, AP_KIND, cache, workers=max(1, fetch_jobs))
+        elif cache is not None:
+            cache.save()
+        return bundled
+
+    if cache is not None:
+        from autopage.recipes import discover_recipes_cached
+
+        ap_repos = discover_recipes_cached(
+            base_url, AP_KIND, workers=max(1, fetch_jobs), cache=cache
+        )
+        log.info("Found %d repo(s) of kind %r", len(ap_repos), AP_KIND)
+        return ap_repos
+
+    if fetch_jobs > 1 or texts:
+        from autopage.recipes import discover_recipes
+
+        ap_repos = discover_recipes(base_url, AP_KIND, workers=max(1, fetch_jobs), prefetched=texts)
+        log.info("Found %d repo(s) of kind %r", len(ap_repos), AP_KIND)
+        return ap_repos
+
+    from toml_repo import RepoManager, set_config_suffix
+
+    from autopage.recipes import CONFIG_SUFFIX
+
+    set_config_suffix(CONFIG_SUFFIX)
     manager = RepoManager()
     _root = manager.add_repo(base_url)
 
@@ -254,6 +414,34 @@ def _discover_ap_repos(dev: bool = False) -> list[object]:
     return ap_repos
 
 
+def compile_recipes(*, dev: bool = False, fetch_jobs: int = 1) -> Path:
+    """Discover and parse every recipe, and write them to the recipe bundle.
+
+    Later runs load the bundle instead of parsing TOML for as long as the
+    digests of its sources still match.  Returns the bundle path.
+    """
+    from autopage.bundle import write_bundle
+    from autopage.recipes import DISCOVERY_WORKERS, discover_recipes
+
+    base_url = _recipes_base_url(dev)
+    log.info("Compiling recipes from %s (dev=%s)", base_url, dev)
+    sources: dict[str, str] = {}
+    repos = discover_recipes(
+        base_url, AP_KIND, workers=max(fetch_jobs, DISCOVERY_WORKERS), sources=sources
+    )
+
+    recipes = []
+    for repo in repos:
+        try:
+            recipes.append((repo.url, _repo_definition(repo)))
+        except Exception as exc:
+            log.error("Error compiling repo %s: %s", repo.url, exc)
+
+    path = write_bundle(base_url, recipes, sources)
+    log.info("Compiled %d recipe(s) into %s", len(recipes), path)
+    return path
+
+
 def _page_name_from_url(url: str) -> str:
     """Derive a page name from a repo URL.
 
@@ -272,35 +460,61 @@ def _page_name_from_url(url: str) -> str:
     return name
 
 
-def repo_to_jsonpage(repo) -> tuple[str, str]:
+def repo_to_jsonpage(
+    repo,
+    *,
+    icons: IconCatalog | None = None,
+    unresolved: set[str] | None = None,
+) -> tuple[str, str]:
     """Convert a toml-repo Repo (with pre-parsed config) to page JSON.
 
     Uses the already-parsed TOML data from the Repo object rather than
-    re-reading from the filesystem.
+    re-reading from the filesystem.  Pass a shared *icons* catalog when
+    converting many repos so it is only fetched once.
+
+    If *unresolved* is given, icon patterns that matched nothing (and were
+    dropped from the page) are added to it in-place.
 
     Returns a tuple of (page_name, page_json).
     """
     log.info("Building page from repo config: %s", repo.url)
 
-    definition = parse_toml_dict(repo.config)
-    definition.source_path = repo.url
+    definition = _repo_definition(repo)
 
     # Resolve icon regex patterns to real media paths
-    _resolve_icons(definition)
+    dropped = _resolve_icons(definition, icons=icons)
+    if unresolved is not None:
+        unresolved.update(dropped)
 
-    # Fetch connected deck serial numbers for auto-change
-    decks = _get_controller_serials()
+    page_name = _page_name_from_url(repo.url)
+    return page_name, _definition_to_jsonpage(page_name, definition)
 
-    page = generate_page_json(definition, decks=decks)
-    page_json = page_json_to_string(page)
 
-    page_name = _page_name_from_url(repo.url)
-    log.info("Generated page %r with %d button(s)", page_name, len(definition.buttons))
+def _repo_definition(repo) -> AutopageDef:
+    """Parse the pre-parsed TOML config of a toml-repo Repo into an AutopageDef.
+
+    Recipes loaded from a compiled bundle are already parsed; they just
+    hand out a fresh copy.
+    """
+    from autopage.bundle import CompiledRecipe
 
-    return page_name, page_json
+    if isinstance(repo, CompiledRecipe):
+        return repo.to_definition()
+    definition = parse_toml_dict(repo.config)
+    definition.source_path = repo.url
+    return definition
 
 
-def process_all_repos(*, dev: bool = False, dry_run: bool = False, force: bool = False) -> None:
+def process_all_repos(
+    *,
+    dev: bool = False,
+    dry_run: bool = False,
+    force: bool = False,
+    fetch_jobs: int = 1,
+    cached: bool = False,
+    sync: bool = False,
+    jobs: int = 1,
+) -> None:
     """Discover all ap.toml repos via toml-repo and process each one.
 
     This is the main entry-point used when no explicit source file is
@@ -310,8 +524,15 @@ def process_all_repos(*, dev: bool = False, dry_run: bool = False, force: bool =
         dev: If True, use local autopage-recipes instead of remote.
         dry_run: If True, print JSON instead of pushing to StreamController.
         force: If True, replace pages that already exist.
+        fetch_jobs: Recipes fetched concurrently during discovery.
+        cached: Discover from the local recipe cache, revalidating it in the
+            background.
+        sync: If True, replace pages already on the controller whose JSON
+            changed since autopage last pushed them, and skip the rest.
+        jobs: If greater than 1, generate pages in this many worker
+            processes (see :func:`_generate_pages_parallel`).
     """
-    ap_repos = _discover_ap_repos(dev=dev)
+    ap_repos = _discover_ap_repos(dev=dev, fetch_jobs=fetch_jobs, cached=cached)
 
     if not ap_repos:
         log.warning("No repos of kind %r found. Nothing to do.", AP_KIND)
@@ -319,16 +540,176 @@ def process_all_repos(*, dev: bool = False, dry_run: bool = False, force: bool =
 
     known_pages = _fetch_known_pages() if not dry_run else set()
 
-    for i, repo in enumerate(ap_repos, 1):
+    # Generate every page, then push them all in one pipelined batch
+    if jobs > 1:
+        generated = _generate_pages_parallel(ap_repos, jobs)
+    else:
+        generated = _generate_pages(ap_repos)
+    pages: list[tuple[str, str]] = []
+    page_urls: dict[str, str] = {}
+    for repo, page in zip(ap_repos, generated):
+        if isinstance(page, Exception):
+            log.error("Error processing repo %s: %s", repo.url, page)
+            continue
+        page_name, page_json = page
+        if dry_run:
+            print(page_json)
+        else:
+            pages.append((page_name, page_json))
+            if force or page_name not in page_urls:
+                page_urls[page_name] = repo.url
+
+    if pages:
+        hashes = PageHashes()
+        outcomes = push_jsonpages(
+            pages, force=force, known_pages=known_pages, sync=sync, hashes=hashes
+        )
+        hashes.save()
+        for page_name, exc in outcomes.items():
+            if exc is not None:
+                log.error("Error processing repo %s: %s", page_urls[page_name], exc)
+
+
+# ── Page generation ──────────────────────────────────────────────────
+
+
+def _generate_pages(ap_repos: list) -> Iterator[tuple[str, str] | Exception]:
+    """Yield ``(page_name, page_json)``, or the error, for each repo in order."""
+    # Parse every recipe up front so all icon patterns resolve in one pass
+    definitions: list[AutopageDef | Exception] = []
+    for repo in ap_repos:
+        try:
+            definitions.append(_repo_definition(repo))
+        except Exception as exc:
+            definitions.append(exc)
+    _resolve_icons_bulk([d for d in definitions if isinstance(d, AutopageDef)])
+
+    for i, (repo, definition) in enumerate(zip(ap_repos, definitions), 1):
         log.info("Processing repo %d/%d: %s", i, len(ap_repos), repo.url)
+        if isinstance(definition, Exception):
+            yield definition
+            continue
         try:
-            page_name, page_json = repo_to_jsonpage(repo)
-            if dry_run:
-                print(page_json)
-            else:
-                push_jsonpage(page_name, page_json, force=force, known_pages=known_pages)
+            page_name = _page_name_from_url(repo.url)
+            yield page_name, _definition_to_jsonpage(page_name, definition)
         except Exception as exc:
-            log.error("Error processing repo %s: %s", repo.url, exc)
+            yield exc
+
+
+# Per-process state of page generation workers, set by _init_page_worker()
+_worker_icons: IconCatalog | None = None
+_worker_decks: list[str] = []
+
+
+def _init_page_worker(
+    index: IconIndex | None, data_path: str, decks: list[str], log_level: int
+) -> None:
+    """Give a worker process the parent's icon index and controller serials."""
+    global _worker_icons, _worker_decks
+    # A no-op when the worker was forked with the parent's logging set up
+    logging.basicConfig(level=log_level, format="%(levelname)s: %(message)s")
+    _worker_icons = IconCatalog.from_index(index, data_path) if index is not None else None
+    _worker_decks = decks
+
+
+def _generate_page(repo) -> tuple[str, str] | Exception:
+    """Build one page in a worker process; an error is returned, not raised."""
+    try:
+        definition = _repo_definition(repo)
+        if _worker_icons is not None:
+            _resolve_icons_bulk([definition], icons=_worker_icons)
+        page_name = _page_name_from_url(repo.url)
+        return page_name, _definition_to_jsonpage(page_name, definition, decks=_worker_decks)
+    except Exception as exc:
+        return exc
+
+
+def _picklable_repo(repo):
+    """Return *repo* in a form that can be sent to a worker process."""
+    from autopage.bundle import CompiledRecipe
+    from autopage.recipes import RecipeRepo
+
+    if isinstance(repo, CompiledRecipe):
+        return repo
+
+    unwrap = getattr(repo.config, "unwrap", None)
+    return RecipeRepo(repo.url, unwrap() if unwrap is not None else dict(repo.config))
+
+
+def _generate_pages_parallel(ap_repos: list, jobs: int) -> Iterator[tuple[str, str] | Exception]:
+    """Like :func:`_generate_pages`, but build the pages in *jobs* worker processes.
+
+    Everything that needs StreamController (the icon index and the
+    controller serials) is fetched once here and handed to every worker
+    read-only, so the workers never touch DBus.  Results still come back
+    in repo order.
+
+    Workers are started by a fork server (or spawned), never forked from
+    this process: it already runs the DBus client's GLib loop thread, and
+    forking a multi-threaded process can deadlock on locks held by it.
+
+    A recipe whose page cannot be built -- its worker crashed, or its
+    result cannot be sent back -- yields that error and the rest carry on.
+    A crash takes the whole pool down with it, so the first recipe left
+    waiting is retried alone in a fresh pool before it is blamed.
+    """
+    import multiprocessing
+    from concurrent.futures import Future, ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    index, data_path = IconCatalog().load_index()
+    if not index:
+        log.info("Icon catalog is empty, skipping icon resolution")
+    decks = _get_controller_serials()
+
+    log.info("Generating %d page(s) in %d worker process(es)", len(ap_repos), jobs)
+    initargs = (index or None, data_path, decks, logging.getLogger().getEffectiveLevel())
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_page_worker,
+            initargs=initargs,
+        )
+
+    def submit(repo) -> Future:
+        try:
+            return pool.submit(_generate_page, _picklable_repo(repo))
+        except Exception as exc:
+            failed = Future()
+            failed.set_exception(exc)
+            return failed
+
+    pool = new_pool()
+    try:
+        futures = [submit(repo) for repo in ap_repos]
+        isolated = False
+        i = 0
+        while i < len(ap_repos):
+            try:
+                result = futures[i].result()
+            except BrokenProcessPool as exc:
+                pool.shutdown(cancel_futures=True)
+                pool = new_pool()
+                if not isolated:
+                    # Any recipe in flight may have crashed the worker; retry this one alone
+                    isolated = True
+                    futures[i] = submit(ap_repos[i])
+                    continue
+                result = exc
+            except Exception as exc:
+                result = exc
+            if isolated:
+                # The rest were lost with the broken pool
+                isolated = False
+                futures[i + 1 :] = [submit(repo) for repo in ap_repos[i + 1 :]]
+            log.info("Processing repo %d/%d: %s", i + 1, len(ap_repos), ap_repos[i].url)
+            yield result
+            i += 1
+    finally:
+        pool.shutdown(cancel_futures=True)
 
 
 # ── Prepared page entry for listen mode ──────────────────────────────
@@ -342,19 +723,20 @@ class _PreparedPage(NamedTuple):
     repo: object  # the toml-repo Repo object (kept for rebuild)
 
 
-def _prepare_all_repos(dev: bool = False) -> list[_PreparedPage]:
+def _prepare_all_repos(
+    dev: bool = False, fetch_jobs: int = 1, cached: bool = False
+) -> list[_PreparedPage]:
     """Discover and parse all ap.toml repos, returning prepared pages.
 
     Each entry contains the parsed definition (with match rules) and the
     repo object so we can later generate JSON on demand.
     """
-    ap_repos = _discover_ap_repos(dev=dev)
+    ap_repos = _discover_ap_repos(dev=dev, fetch_jobs=fetch_jobs, cached=cached)
     prepared: list[_PreparedPage] = []
 
     for repo in ap_repos:
         try:
-            definition = parse_toml_dict(repo.config)
-            definition.source_path = repo.url
+            definition = _repo_definition(repo)
             page_name = _page_name_from_url(repo.url)
             prepared.append(_PreparedPage(page_name, definition, repo))
             log.info(
@@ -414,25 +796,71 @@ def _activate_page_on_all_controllers(page_name: str) -> None:
             log.warning("Failed to set active page on controller %s: %s", serial, exc)
 
 
-def listen_and_autoswitch(*, dev: bool = False, force: bool = False) -> None:
+def _pages_gaining_icons(
+    unresolved_by_page: dict[str, set[str]], icons: IconCatalog, added_packs: list[str]
+) -> list[str]:
+    """Return the pages with a previously dropped icon that one of *added_packs* provides.
+
+    Only the dropped patterns are matched, and only against the new packs.
+    """
+    index = icons.index_for_packs(added_packs)
+    hits: dict[str, bool] = {}
+
+    def now_matches(pattern: str) -> bool:
+        if pattern not in hits:
+            try:
+                hits[pattern] = index.match(pattern) is not None
+            except re.error:
+                hits[pattern] = False
+        return hits[pattern]
+
+    return [
+        page_name
+        for page_name, patterns in unresolved_by_page.items()
+        if any(now_matches(p) for p in patterns)
+    ]
+
+
+def listen_and_autoswitch(
+    *,
+    dev: bool = False,
+    force: bool = False,
+    fetch_jobs: int = 1,
+    cached: bool = False,
+    sync: bool = False,
+) -> None:
     """Listen for ForegroundWindow changes and auto-switch pages.
 
     1. Discover and pre-parse all ap.toml files (like process_all_repos).
     2. Start listening for DBus property changes on the StreamController service.
     3. When ForegroundWindow changes, check all match rules.
     4. For each matching page, push it (respecting --force) and set it active
-       on all controllers.
+       on all controllers.  With *sync*, a page already on the controller is
+       rebuilt once per run and replaced if it changed since it was pushed.
     """
-    from autopage.api_client import get_client
+    from gi.repository import GLib
 
-    prepared_pages = _prepare_all_repos(dev=dev)
+    from autopage.api_client import IFACE, OBJECT, get_client
+
+    prepared_pages = _prepare_all_repos(dev=dev, fetch_jobs=fetch_jobs, cached=cached)
     if not prepared_pages:
         log.warning("No ap.toml repos found. Nothing to listen for.")
         return
 
-    # Snapshot which pages the controller already has so we can skip
-    # redundant pushes (unless --force).
+    client = get_client()
+
+    # Which pages the controller already has, so we can skip redundant
+    # pushes (unless --force).  Re-read (from the client's local mirror)
+    # on every window change so pages deleted by hand get pushed again.
     known_pages = _fetch_known_pages()
+    icons = IconCatalog()
+    # Icon patterns dropped from pages pushed by this daemon, by page name
+    unresolved_by_page: dict[str, set[str]] = {}
+    # JSON of every page this daemon pushed, for re-pushing after a restart
+    pushed_pages: dict[str, str] = {}
+    # Digests of pushed pages, and the pages already checked against them (--sync)
+    hashes = PageHashes()
+    synced: set[str] = set()
 
     log.info(
         "Loaded %d page(s) with match rules, %d page(s) already on controller. "
@@ -441,7 +869,92 @@ def listen_and_autoswitch(*, dev: bool = False, force: bool = False) -> None:
         len(known_pages),
     )
 
+    def refresh_known_pages() -> None:
+        nonlocal known_pages
+        known_pages = _fetch_known_pages()
+
+    def build_and_push(entry: _PreparedPage, *, replace: bool) -> bool:
+        refresh_known_pages()
+        unresolved: set[str] = set()
+        page_name, page_json = repo_to_jsonpage(entry.repo, icons=icons, unresolved=unresolved)
+        pushed = push_jsonpage(
+            page_name, page_json, force=replace, known_pages=known_pages, sync=sync, hashes=hashes
+        )
+        synced.add(page_name)
+        if pushed:
+            pushed_pages[page_name] = page_json
+            hashes.save()
+        if unresolved:
+            unresolved_by_page[page_name] = unresolved
+        else:
+            unresolved_by_page.pop(page_name, None)
+        return pushed
+
+    def on_icon_packs_changed():
+        # Fetch newly installed packs now and update the on-disk cache
+        added = icons.refresh()
+        if not added or not unresolved_by_page:
+            return
+
+        for page_name in _pages_gaining_icons(unresolved_by_page, icons, added):
+            entry = next((e for e in prepared_pages if e.page_name == page_name), None)
+            if entry is None:
+                continue
+            log.info("New icon pack provides dropped icon(s) for page %r, re-pushing", page_name)
+            try:
+                build_and_push(entry, replace=True)
+            except Exception as exc:
+                log.error("Error re-pushing page %r: %s", page_name, exc)
+
+    # GLib source of the pending resync; one at a time however often the
+    # service restarts, so retries never run in parallel
+    resync_source: int | None = None
+
+    def schedule_resync(delay_ms: int | None) -> None:
+        """(Re)start the resync backoff at *delay_ms*, or cancel it with *None*."""
+        nonlocal resync_source
+        if resync_source is not None:
+            GLib.source_remove(resync_source)
+            resync_source = None
+        if delay_ms is not None:
+            resync_source = GLib.timeout_add(delay_ms, resync, delay_ms)
+
+    def resync(delay_ms: int) -> bool:
+        """Re-push pages this daemon created that the restarted service lacks."""
+        nonlocal resync_source
+        resync_source = None
+        client.forget_state()
+        try:
+            current = set(client.get_pages())
+        except Exception as exc:
+            next_delay = min(delay_ms * 2, RESYNC_MAX_DELAY_MS)
+            log.info("StreamController not ready (%s), retrying in %d ms", exc, next_delay)
+            schedule_resync(next_delay)
+            return GLib.SOURCE_REMOVE
+
+        refresh_known_pages()
+        missing = [(name, json) for name, json in pushed_pages.items() if name not in current]
+        log.info("Resynced with StreamController, re-pushing %d missing page(s)", len(missing))
+        outcomes = push_jsonpages(missing, known_pages=known_pages, hashes=hashes)
+        hashes.save()
+        for page_name, exc in outcomes.items():
+            if exc is not None:
+                log.error("Error re-pushing page %r: %s", page_name, exc)
+        return GLib.SOURCE_REMOVE
+
+    def on_owner_changed(new_owner: str):
+        if not new_owner:
+            log.warning("StreamController went away, waiting for it to come back...")
+            schedule_resync(None)
+            return
+        log.info("StreamController (re)started, resyncing")
+        schedule_resync(RESYNC_INITIAL_DELAY_MS)
+
     def on_property_changed(object_path, iface, prop, value):
+        if prop in ("IconPacks", "DataPath"):
+            on_icon_packs_changed()
+            return
+
         if prop != "ForegroundWindow":
             return
 
@@ -463,20 +976,19 @@ def listen_and_autoswitch(*, dev: bool = False, force: bool = False) -> None:
             log.debug("No matching pages for current window")
             return
 
+        refresh_known_pages()
+
         for entry in matched:
             try:
                 page_name = _page_name_from_url(entry.repo.url)
-                if not force and page_name in known_pages:
+                if not force and page_name in known_pages and (not sync or page_name in synced):
                     log.debug(
                         "Page %r already on controller, skipping rebuild",
                         page_name,
                     )
                 else:
                     # create a new page and switch to it
-                    page_name, page_json = repo_to_jsonpage(entry.repo)
-                    pushed = push_jsonpage(
-                        page_name, page_json, force=force, known_pages=known_pages
-                    )
+                    pushed = build_and_push(entry, replace=force)
                     if pushed:
                         _activate_page_on_all_controllers(page_name)
                         log.info("Switched to page %r", page_name)
@@ -488,5 +1000,13 @@ def listen_and_autoswitch(*, dev: bool = False, force: bool = False) -> None:
             except Exception as exc:
                 log.error("Error pushing page %r: %s", entry.page_name, exc)
 
-    client = get_client()
-    client.listen(callback=on_property_changed)
+    # Only the root object's own properties matter here; ask the bus for
+    # nothing else so unrelated updates (per-deck pages, brightness, …)
+    # never wake us up.
+    client.listen(
+        callback=on_property_changed,
+        paths=[OBJECT],
+        interfaces=[IFACE],
+        properties={"ForegroundWindow", "IconPacks", "DataPath"},
+        on_owner_changed=on_owner_changed,
+    )
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Stand-in StreamController DBus service for tests and benchmarks.
+
+Implements the subset of the StreamController DBus API that
+``api_client.py`` uses, backed by in-memory state, so the engine and the
+client can be exercised without a real StreamController or Stream Deck.
+
+Usage:
+    python -m autopage.fake_service                               # Serve on the session bus
+    python -m autopage.fake_service --latency-ms 5 --jitter-ms 2  # Add per-call latency
+    python -m autopage.fake_service --icon-packs 4 --icons-per-pack 5000
+    python -m autopage.fake_service --fail AddPage=0.1            # Fail 10% of AddPage calls
+    python -m autopage.fake_service --private-bus                 # Start its own dbus-daemon
+
+``PrivateBus`` runs a throwaway ``dbus-daemon`` and ``FakeServiceProcess``
+runs this module against it; the pytest fixtures in ``tests/conftest.py``
+are built on both.  Only the service itself needs PyGObject, so this module
+imports ``gi`` lazily.
+"""
+
+import argparse
+import os
+import random
+import select
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from glob import glob
+from pathlib import Path
+
+from autopage.api_client import CTRL_IFACE, IFACE, OBJECT, SERVICE, _ctrl_path
+
+ERROR_PREFIX = IFACE + ".Error"
+# Printed on stdout once the service owns its bus name
+READY_LINE = "READY"
+# Seconds to wait for dbus-daemon or the service to come up
+STARTUP_TIMEOUT = 10.0
+
+INTROSPECTION_XML = f"""
+<node>
+  <interface name="{IFACE}">
+    <method name="AddPage">
+      <arg name="name" type="s" direction="in"/>
+      <arg name="json_contents" type="s" direction="in"/>
+    </method>
+    <method name="RemovePage">
+      <arg name="name" type="s" direction="in"/>
+    </method>
+    <method name="NotifyForegroundWindow">
+      <arg name="window_name" type="s" direction="in"/>
+      <arg name="window_class" type="s" direction="in"/>
+    </method>
+    <method name="GetIconNames">
+      <arg name="pack_id" type="s" direction="in"/>
+      <arg name="names" type="as" direction="out"/>
+    </method>
+    <property name="Controllers" type="as" access="read"/>
+    <property name="Pages" type="as" access="read"/>
+    <property name="IconPacks" type="as" access="read"/>
+    <property name="DataPath" type="s" access="read"/>
+    <property name="ForegroundWindow" type="(ss)" access="read"/>
+  </interface>
+  <interface name="{CTRL_IFACE}">
+    <method name="SetActivePage">
+      <arg name="name" type="s" direction="in"/>
+    </method>
+    <property name="ActivePageName" type="s" access="read"/>
+  </interface>
+</node>
+"""
+
+# Stems for generated icon names, so real recipe patterns find matches
+_ICON_STEMS = (
+    "add", "apps", "bookmark", "build", "close", "code", "content_copy", "content_cut",
+    "content_paste", "delete", "download", "edit", "folder", "format_bold", "format_italic",
+    "fullscreen", "help", "home", "keyboard", "menu", "mic", "music_note", "open_in_new",
+    "pause", "play_arrow", "print", "redo", "refresh", "save", "search", "settings", "skip_next",
+    "skip_previous", "stop", "terminal", "undo", "upload", "volume_down", "volume_up", "zoom_in",
+    "zoom_out",
+)  # fmt: skip
+
+
+def fake_icon_names(count: int) -> list[str]:
+    """Return *count* icon names shaped like a Material-style pack."""
+    names = []
+    round_ = 0
+    while len(names) < count:
+        for stem in _ICON_STEMS:
+            base = stem if round_ == 0 else f"{stem}_{round_}"
+            names.extend((base, f"{base}-inv"))
+        round_ += 1
+    return names[:count]
+
+
+def _icon_packs_on_disk(data_path: str) -> dict[str, list[str]]:
+    """Return the icon packs installed under an absolute *data_path*, if any.
+
+    Like StreamController, a pack's icons are the ``*.png`` files in
+    ``<data_path>/icons/<pack_id>/icons``, sorted by file name and listed
+    without the extension.
+    """
+    packs_dir = Path(data_path) / "icons"
+    if not os.path.isabs(data_path) or not packs_dir.is_dir():
+        return {}
+    return {
+        pack.name: [
+            name.removesuffix(".png") for name in sorted(glob("*.png", root_dir=pack / "icons"))
+        ]
+        for pack in sorted(packs_dir.iterdir())
+        if pack.is_dir()
+    }
+
+
+@dataclass
+class FakeConfig:
+    """Knobs for the fake service."""
+
+    controllers: list[str] = field(default_factory=lambda: ["fake-deck-1", "fake-deck-2"])
+    pages: list[str] = field(default_factory=list)
+    icon_packs: int = 1
+    icons_per_pack: int = 100
+    data_path: str = "data"
+    # Added to every method call and property read, in milliseconds
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Method name -> probability (0..1) that a call fails with an Injected error
+    fail: dict[str, float] = field(default_factory=dict)
+    seed: int | None = None
+
+    def to_args(self) -> list[str]:
+        """Return the command-line arguments that recreate this config."""
+        args = [
+            f"--icon-packs={self.icon_packs}",
+            f"--icons-per-pack={self.icons_per_pack}",
+            f"--data-path={self.data_path}",
+            f"--latency-ms={self.latency_ms}",
+            f"--jitter-ms={self.jitter_ms}",
+        ]
+        args += [f"--controller={serial}" for serial in self.controllers]
+        args += [f"--page={name}" for name in self.pages]
+        args += [f"--fail={name}={rate}" for name, rate in self.fail.items()]
+        if self.seed is not None:
+            args.append(f"--seed={self.seed}")
+        return args
+
+
+class FakeStreamController:
+    """In-memory StreamController state exported over DBus with Gio."""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.pages: dict[str, str] = {name: "" for name in config.pages}
+        self.active_pages: dict[str, str] = {serial: "" for serial in config.controllers}
+        self.icon_packs = _icon_packs_on_disk(config.data_path) or {
+            f"com_fake_Pack{i}": fake_icon_names(config.icons_per_pack)
+            for i in range(config.icon_packs)
+        }
+        self.foreground_window = ("", "")
+        self._random = random.Random(config.seed)
+        self._connection = None
+        self._controller_paths: dict[str, str] = {}
+
+    # ── Publishing ───────────────────────────────────────────────────
+
+    def publish(self, connection) -> None:
+        """Register the root and per-controller objects on *connection*."""
+        from gi.repository import Gio
+
+        self._connection = connection
+        node = Gio.DBusNodeInfo.new_for_xml(INTROSPECTION_XML)
+        connection.register_object(
+            OBJECT, node.lookup_interface(IFACE), self._on_method_call, self._on_get_property
+        )
+        for serial in self.config.controllers:
+            path = _ctrl_path(serial)
+            self._controller_paths[path] = serial
+            connection.register_object(
+                path, node.lookup_interface(CTRL_IFACE), self._on_method_call, self._on_get_property
+            )
+
+    def _delay_ms(self) -> float:
+        jitter = self._random.uniform(0, self.config.jitter_ms) if self.config.jitter_ms else 0
+        return self.config.latency_ms + jitter
+
+    def _emit_changed(self, path: str, iface: str, name: str, value) -> None:
+        from gi.repository import GLib
+
+        self._connection.emit_signal(
+            None,
+            path,
+            "org.freedesktop.DBus.Properties",
+            "PropertiesChanged",
+            GLib.Variant("(sa{sv}as)", (iface, {name: value}, [])),
+        )
+
+    # ── Properties ───────────────────────────────────────────────────
+
+    def _on_get_property(self, connection, sender, object_path, iface, name):
+        from gi.repository import GLib
+
+        delay = self._delay_ms()
+        if delay:
+            # Property reads are answered synchronously, so latency blocks the loop
+            time.sleep(delay / 1000)
+        if iface == CTRL_IFACE:
+            return GLib.Variant("s", self.active_pages[self._controller_paths[object_path]])
+        if name == "Controllers":
+            return GLib.Variant("as", list(self.active_pages))
+        if name == "Pages":
+            return GLib.Variant("as", list(self.pages))
+        if name == "IconPacks":
+            return GLib.Variant("as", list(self.icon_packs))
+        if name == "DataPath":
+            return GLib.Variant("s", self.config.data_path)
+        if name == "ForegroundWindow":
+            return GLib.Variant("(ss)", self.foreground_window)
+        return None
+
+    # ── Methods ──────────────────────────────────────────────────────
+
+    def _on_method_call(
+        self, connection, sender, object_path, iface, method, parameters, invocation
+    ):
+        from gi.repository import GLib
+
+        args = parameters.unpack()
+
+        def reply():
+            if self._random.random() < self.config.fail.get(method, 0.0):
+                invocation.return_dbus_error(
+                    f"{ERROR_PREFIX}.Injected", f"Injected failure in {method}"
+                )
+                return GLib.SOURCE_REMOVE
+            try:
+                result = self._handle(object_path, method, *args)
+            except _ServiceError as exc:
+                invocation.return_dbus_error(f"{ERROR_PREFIX}.{exc.name}", str(exc))
+            else:
+                invocation.return_value(result)
+            return GLib.SOURCE_REMOVE
+
+        # Methods reply from a timer so slow calls can overlap, as over a real bus
+        delay = self._delay_ms()
+        if delay:
+            GLib.timeout_add(max(1, round(delay)), reply)
+        else:
+            reply()
+
+    def _handle(self, object_path: str, method: str, *args):
+        from gi.repository import GLib
+
+        if method == "AddPage":
+            name, json_contents = args
+            if name in self.pages:
+                raise _ServiceError("PageExists", f"PageExists: page {name!r} already exists")
+            self.pages[name] = json_contents
+            self._emit_changed(OBJECT, IFACE, "Pages", GLib.Variant("as", list(self.pages)))
+            return None
+        if method == "RemovePage":
+            (name,) = args
+            if self.pages.pop(name, None) is None:
+                raise _ServiceError("NoSuchPage", f"NoSuchPage: page {name!r} does not exist")
+            self._emit_changed(OBJECT, IFACE, "Pages", GLib.Variant("as", list(self.pages)))
+            return None
+        if method == "NotifyForegroundWindow":
+            self.foreground_window = tuple(args)
+            self._emit_changed(
+                OBJECT, IFACE, "ForegroundWindow", GLib.Variant("(ss)", self.foreground_window)
+            )
+            return None
+        if method == "GetIconNames":
+            (pack_id,) = args
+            if pack_id not in self.icon_packs:
+                raise _ServiceError("NoSuchIconPack", f"NoSuchIconPack: {pack_id!r}")
+            return GLib.Variant("(as)", (self.icon_packs[pack_id],))
+        if method == "SetActivePage":
+            (name,) = args
+            if name not in self.pages:
+                raise _ServiceError("NoSuchPage", f"NoSuchPage: page {name!r} does not exist")
+            self.active_pages[self._controller_paths[object_path]] = name
+            self._emit_changed(object_path, CTRL_IFACE, "ActivePageName", GLib.Variant("s", name))
+            return None
+        raise _ServiceError("UnknownMethod", f"Unknown method {method}")
+
+
+class _ServiceError(Exception):
+    """A DBus error to return to the caller, named ``<ERROR_PREFIX>.<name>``."""
+
+    def __init__(self, name: str, message: str):
+        super().__init__(message)
+        self.name = name
+
+
+def serve(config: FakeConfig) -> None:
+    """Own the StreamController bus name and serve until interrupted."""
+    from gi.repository import Gio, GLib
+
+    service = FakeStreamController(config)
+    loop = GLib.MainLoop()
+
+    def on_bus_acquired(connection, name):
+        service.publish(connection)
+
+    def on_name_acquired(connection, name):
+        print(READY_LINE, flush=True)
+
+    def on_name_lost(connection, name):
+        print(f"Error: could not own {name} on the session bus", file=sys.stderr)
+        loop.quit()
+
+    Gio.bus_own_name(
+        Gio.BusType.SESSION,
+        SERVICE,
+        Gio.BusNameOwnerFlags.NONE,
+        on_bus_acquired,
+        on_name_acquired,
+        on_name_lost,
+    )
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+
+
+# ── Process helpers ──────────────────────────────────────────────────
+
+
+def _wait_for_line(proc: subprocess.Popen, what: str) -> str:
+    """Read one stdout line from *proc*, failing after STARTUP_TIMEOUT."""
+    ready, _, _ = select.select([proc.stdout], [], [], STARTUP_TIMEOUT)
+    line = proc.stdout.readline().strip() if ready else ""
+    if not line:
+        proc.kill()
+        proc.wait()
+        raise RuntimeError(f"{what} did not start within {STARTUP_TIMEOUT:g}s")
+    return line
+
+
+class PrivateBus:
+    """A throwaway ``dbus-daemon`` session bus, usable as a context manager."""
+
+    def __init__(self):
+        self.address: str | None = None
+        self._proc: subprocess.Popen | None = None
+
+    def start(self) -> "PrivateBus":
+        self._proc = subprocess.Popen(
+            ["dbus-daemon", "--session", "--nofork", "--print-address"],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self.address = _wait_for_line(self._proc, "dbus-daemon")
+        return self
+
+    def stop(self) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc = None
+
+    def __enter__(self) -> "PrivateBus":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class FakeServiceProcess:
+    """Runs the fake service in a child process on the bus at *address*."""
+
+    def __init__(self, address: str, config: FakeConfig | None = None):
+        self.address = address
+        self.config = config or FakeConfig()
+        self._proc: subprocess.Popen | None = None
+
+    def start(self) -> "FakeServiceProcess":
+        env = dict(os.environ, DBUS_SESSION_BUS_ADDRESS=self.address)
+        src = str(Path(__file__).resolve().parent.parent)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+        self._proc = subprocess.Popen(
+            [sys.executable, "-m", "autopage.fake_service", *self.config.to_args()],
+            stdout=subprocess.PIPE,
+            text=True,
+            env=env,
+        )
+        _wait_for_line(self._proc, "Fake StreamController")
+        return self
+
+    def stop(self) -> None:
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait()
+            self._proc = None
+
+    def restart(self) -> "FakeServiceProcess":
+        """Stop and start again with fresh state, like a StreamController restart."""
+        self.stop()
+        return self.start()
+
+    def __enter__(self) -> "FakeServiceProcess":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+# ── CLI ──────────────────────────────────────────────────────────────
+
+
+def _parse_fail(spec: str) -> tuple[str, float]:
+    name, _, rate = spec.partition("=")
+    try:
+        return name, float(rate) if rate else 1.0
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected METHOD=RATE, got {spec!r}") from None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Fake StreamController DBus service")
+    parser.add_argument(
+        "--controller",
+        action="append",
+        dest="controllers",
+        metavar="SERIAL",
+        help="Controller serial number (repeatable, default: fake-deck-1 and fake-deck-2)",
+    )
+    parser.add_argument(
+        "--page", action="append", dest="pages", default=[], metavar="NAME", help="Initial page"
+    )
+    parser.add_argument("--icon-packs", type=int, default=1, help="Number of icon packs")
+    parser.add_argument("--icons-per-pack", type=int, default=100, help="Icons in each pack")
+    parser.add_argument(
+        "--data-path",
+        default="data",
+        help="Value of the DataPath property; icon packs under an absolute one are served",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to each call")
+    parser.add_argument(
+        "--jitter-ms", type=float, default=0.0, help="Random extra delay, up to this much"
+    )
+    parser.add_argument(
+        "--fail",
+        action="append",
+        type=_parse_fail,
+        default=[],
+        metavar="METHOD=RATE",
+        help="Fail this fraction of calls to METHOD (repeatable)",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Seed for jitter and failures")
+    parser.add_argument(
+        "--private-bus",
+        action="store_true",
+        help="Start a private dbus-daemon and print its address first",
+    )
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    config = FakeConfig(
+        pages=args.pages,
+        icon_packs=args.icon_packs,
+        icons_per_pack=args.icons_per_pack,
+        data_path=args.data_path,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        fail=dict(args.fail),
+        seed=args.seed,
+    )
+    if args.controllers:
+        config.controllers = args.controllers
+
+    if not args.private_bus:
+        serve(config)
+        return
+
+    with PrivateBus() as bus:
+        print(f"DBUS_SESSION_BUS_ADDRESS={bus.address}", flush=True)
+        with FakeServiceProcess(bus.address, config):
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,537 @@
+"""Icon catalog: the set of icons StreamController knows about.
+
+The catalog is fetched over DBus (one ``GetIconNames`` call per icon pack),
+which is expensive, so callers keep a single :class:`IconCatalog` around for
+a whole run and share it between recipes.  The per-pack icon names are also
+persisted under ``$XDG_CACHE_HOME/autopage`` so a cold start only has to
+fetch packs it has not seen before, and when StreamController's ``DataPath``
+is readable locally those packs are listed straight from disk.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from functools import lru_cache
+from itertools import accumulate
+
+from autopage.cache import cache_path, load_json, save_json
+
+log = logging.getLogger(__name__)
+
+# Layout version of the icon cache file (see autopage.cache)
+ICON_CACHE_VERSION = 1
+# Number of icon packs whose names are fetched from StreamController in parallel.
+ICON_FETCH_WORKERS = 4
+# DBus timeout (milliseconds) for a single pack's GetIconNames call.
+ICON_FETCH_TIMEOUT_MS = 10_000
+# Number of resolved icon patterns remembered by an IconCatalog.
+ICON_RESOLVE_CACHE_SIZE = 1024
+
+
+def icon_media_path(data_path: str, pack_id: str, icon_name: str) -> str:
+    """Build the media path StreamController expects for an icon."""
+    return os.path.join(data_path, "icons", pack_id, "icons", f"{icon_name}.png")
+
+
+# ── On-disk cache ────────────────────────────────────────────────────
+
+
+def _load_icon_cache() -> tuple[str, dict[str, list[str]]] | None:
+    """Read the icon cache, returning ``(data_path, {pack_id: names})``.
+
+    Returns *None* if there is no usable cache (missing, unreadable, or
+    written by a different cache version).
+    """
+    doc = load_json(cache_path("icons.json"), ICON_CACHE_VERSION, "icon cache")
+    if doc is None:
+        return None
+    return doc.get("data_path", ""), dict(doc.get("packs", {}))
+
+
+def _save_icon_cache(data_path: str, packs: dict[str, list[str]]) -> None:
+    """Atomically write the icon cache."""
+    path = cache_path("icons.json")
+    doc = {"version": ICON_CACHE_VERSION, "data_path": data_path, "packs": packs}
+    try:
+        save_json(path, doc)
+    except (OSError, TypeError, ValueError) as exc:
+        log.warning("Could not write icon cache %s: %s", path, exc)
+
+
+# ── Compact storage ──────────────────────────────────────────────────
+
+
+class CompactCatalog(Sequence[tuple[str, str]]):
+    """Memory-lean catalog: a pack table plus one tuple of interned names per pack.
+
+    Behaves like a read-only sequence of ``(pack_id, icon_name)`` tuples in
+    catalog order, but those tuples are only created on access, so a
+    long-lived process holds a few pack-sized tuples instead of one small
+    tuple per icon.  Names repeated across packs share a single string.
+    """
+
+    __slots__ = ("_packs", "_names", "_starts")
+
+    def __init__(self, packs: Mapping[str, Iterable[str]] | None = None):
+        self._packs: list[str] = []
+        self._names: list[tuple[str, ...]] = []
+        for pack_id, names in (packs or {}).items():
+            self._add_run(pack_id, names)
+        self._finish()
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[tuple[str, str]]) -> CompactCatalog:
+        """Build from ``(pack_id, icon_name)`` pairs, preserving their order."""
+        catalog = cls()
+        run_pack: str | None = None
+        run: list[str] = []
+        for pack_id, icon_name in pairs:
+            if pack_id != run_pack and run:
+                catalog._add_run(run_pack, run)
+                run = []
+            run_pack = pack_id
+            run.append(icon_name)
+        if run:
+            catalog._add_run(run_pack, run)
+        catalog._finish()
+        return catalog
+
+    def _add_run(self, pack_id: str, names: Iterable[str]) -> None:
+        self._packs.append(sys.intern(pack_id))
+        self._names.append(tuple(sys.intern(n) for n in names))
+
+    def _finish(self) -> None:
+        # _starts[i] is the catalog position of the first icon of run i
+        self._starts = array("L", accumulate((len(n) for n in self._names), initial=0))
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def __getitem__(self, pos: int) -> tuple[str, str]:
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError("catalog index out of range")
+        run = bisect_right(self._starts, pos) - 1
+        return self._packs[run], self._names[run][pos - self._starts[run]]
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        for pack_id, names in zip(self._packs, self._names):
+            for icon_name in names:
+                yield pack_id, icon_name
+
+    def name(self, pos: int) -> str:
+        """Return just the icon name at catalog position *pos*."""
+        run = bisect_right(self._starts, pos) - 1
+        return self._names[run][pos - self._starts[run]]
+
+    def iter_names(self, positions: Iterable[int] | None = None) -> Iterator[tuple[int, str]]:
+        """Yield ``(position, icon_name)`` for ascending *positions*, or for every icon.
+
+        Walks the runs directly rather than looking each position up.
+        """
+        if positions is None:
+            for start, names in zip(self._starts, self._names):
+                for offset, icon_name in enumerate(names):
+                    yield start + offset, icon_name
+            return
+
+        run = 0
+        for pos in positions:
+            while pos >= self._starts[run + 1]:
+                run += 1
+            yield pos, self._names[run][pos - self._starts[run]]
+
+    def pack_ids(self) -> list[str]:
+        """Return the distinct pack IDs in catalog order."""
+        return list(dict.fromkeys(self._packs))
+
+    def select(self, pack_ids: Iterable[str]) -> CompactCatalog:
+        """Return a catalog holding only the entries of the given packs."""
+        wanted = set(pack_ids)
+        subset = CompactCatalog()
+        for pack_id, names in zip(self._packs, self._names):
+            if pack_id in wanted:
+                subset._packs.append(pack_id)
+                subset._names.append(names)
+        subset._finish()
+        return subset
+
+
+# ── Catalog ──────────────────────────────────────────────────────────
+
+
+def _scan_icon_names(data_path: str, pack_id: str) -> list[str] | None:
+    """List a pack's icon names from ``<data_path>/icons/<pack_id>/icons``.
+
+    Returns the same list ``GetIconNames`` does: the pack's ``*.png`` files
+    (hidden files and other extensions are skipped) sorted by file name,
+    then stripped of the extension -- so ``10k-inv`` comes before ``10k``.
+    Returns *None* if the directory cannot be read.
+    """
+    icons_dir = os.path.join(data_path, "icons", pack_id, "icons")
+    try:
+        with os.scandir(icons_dir) as entries:
+            files = sorted(
+                e.name
+                for e in entries
+                if e.name.endswith(".png") and not e.name.startswith(".") and e.is_file()
+            )
+        return [name.removesuffix(".png") for name in files]
+    except OSError as exc:
+        log.debug("Cannot scan %s, falling back to DBus: %s", icons_dir, exc)
+        return None
+
+
+def _fetch_icon_names(client, pack_ids: list[str], data_path: str) -> dict[str, list[str]]:
+    """Fetch the icon names of several packs.
+
+    When *data_path* is an absolute (local) path, packs are listed from the
+    filesystem without touching DBus.  Any pack whose directory cannot be
+    read is fetched over DBus instead, concurrently, with its own DBus
+    timeout so a slow or failing pack is logged and left out without
+    holding up the others.
+    """
+    names: dict[str, list[str]] = {}
+    if os.path.isabs(data_path):
+        for pack_id in pack_ids:
+            scanned = _scan_icon_names(data_path, pack_id)
+            if scanned is not None:
+                log.debug("Read %d icon(s) for pack %r from disk", len(scanned), pack_id)
+                names[pack_id] = scanned
+        pack_ids = [p for p in pack_ids if p not in names]
+
+    if not pack_ids:
+        return names
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fetch(pack_id: str) -> list[str]:
+        log.debug("Fetching icons for pack %r", pack_id)
+        return list(client.get_icon_names(pack_id, timeout=ICON_FETCH_TIMEOUT_MS))
+
+    with ThreadPoolExecutor(max_workers=min(ICON_FETCH_WORKERS, len(pack_ids))) as pool:
+        futures = {pack_id: pool.submit(fetch, pack_id) for pack_id in pack_ids}
+        for pack_id, future in futures.items():
+            try:
+                names[pack_id] = future.result()
+            except Exception as exc:
+                log.warning("Could not fetch icons for pack %r: %s", pack_id, exc)
+    return names
+
+
+def build_icon_catalog(client=None, *, use_cache: bool = True) -> tuple[CompactCatalog, str]:
+    """Fetch all icon packs and their icons from StreamController.
+
+    Args:
+        client: An optional ``StreamControllerClient`` instance.  When *None*
+                a new client is created (requires DBus).
+        use_cache: If True, icon names of packs already in the on-disk cache
+                   are reused and only new packs are fetched.  Packs that are
+                   no longer installed are dropped from the cache.  A change
+                   of ``DataPath`` discards the whole cache.
+
+    Packs that are not cached are read from ``DataPath`` on disk when it is
+    local, otherwise fetched over DBus concurrently; a pack that fails or
+    times out is skipped.  The catalog keeps the pack order reported by
+    StreamController, so match precedence does not depend on fetch timing.
+
+    Returns a tuple of (catalog, data_path) where catalog is a
+    :class:`CompactCatalog` of ``(pack_id, icon_name)`` entries and
+    data_path is the base path from the StreamController API.
+    """
+    if client is None:
+        from autopage.api_client import get_client
+
+        client = get_client()
+
+    data_path = "data"  # fallback
+    try:
+        data_path = client.get_data_path()
+    except Exception as exc:
+        log.warning("Could not fetch DataPath from StreamController: %s", exc)
+
+    cached_packs: dict[str, list[str]] = {}
+    if use_cache:
+        cached = _load_icon_cache()
+        if cached is not None:
+            cached_data_path, cached_packs = cached
+            if cached_data_path != data_path:
+                log.info("DataPath changed, discarding icon cache")
+                cached_packs = {}
+
+    packs: dict[str, list[str]] = {}
+    try:
+        pack_ids = list(client.get_icon_packs())
+    except Exception as exc:
+        log.warning("Could not fetch icon catalog from StreamController: %s", exc)
+    else:
+        missing = [p for p in pack_ids if p not in cached_packs]
+        fetched = _fetch_icon_names(client, missing, data_path)
+        for pack_id in pack_ids:
+            if pack_id in cached_packs:
+                log.debug("Using cached icons for pack %r", pack_id)
+                packs[pack_id] = cached_packs[pack_id]
+            elif pack_id in fetched:
+                packs[pack_id] = fetched[pack_id]
+        if use_cache and packs.keys() != cached_packs.keys():
+            _save_icon_cache(data_path, packs)
+
+    catalog = CompactCatalog(packs)
+    if packs:
+        log.info(
+            "Icon catalog: %d icon(s) across %d pack(s) (%d from cache)",
+            len(catalog),
+            len(packs),
+            len(packs.keys() & cached_packs.keys()),
+        )
+
+    return catalog, data_path
+
+
+# ── Index ────────────────────────────────────────────────────────────
+
+# Characters with special meaning in a regex (outside a character class).
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+# Quantifiers that make the preceding character optional.
+_OPTIONAL_QUANTIFIERS = frozenset("*?{")
+
+
+def _is_literal(pattern: str) -> bool:
+    """True if *pattern* contains no regex metacharacters."""
+    return not any(ch in _REGEX_META for ch in pattern)
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Return the literal text every match of *pattern* must start with.
+
+    Conservative: returns ``""`` whenever the pattern could match without
+    a fixed prefix (alternation, leading group, optional first char, …).
+    """
+    if "|" in pattern:
+        return ""
+    for i, ch in enumerate(pattern):
+        if ch in _REGEX_META:
+            if ch in _OPTIONAL_QUANTIFIERS:
+                return pattern[: max(i - 1, 0)]
+            return pattern[:i]
+    return pattern
+
+
+class IconIndex:
+    """Lookup structure over a catalog that avoids scanning every icon.
+
+    Patterns are resolved by the cheapest applicable tier:
+
+    1. literal patterns (``content_copy``) → case-folded exact-name hash map;
+    2. patterns with a literal prefix (``arrow_.*``) → bisect into a sorted
+       name array, then regex-check only the names sharing that prefix;
+    3. anything else → regex scan of the whole catalog.
+
+    Every tier returns the same entry as a linear case-insensitive
+    ``fullmatch`` scan would: the first match in catalog order.  Non-ASCII
+    names are kept out of the hash map and sorted array (regex case
+    folding differs from ``str.casefold`` for a few characters) and are
+    always regex-checked.
+    """
+
+    def __init__(self, catalog: Iterable[tuple[str, str]]):
+        if not isinstance(catalog, CompactCatalog):
+            catalog = CompactCatalog.from_pairs(catalog)
+        self._catalog = catalog
+        self._exact: dict[str, int] = {}
+        self._non_ascii: list[int] = []
+        keys: list[str] = []
+        positions = array("L")
+        for pos, (_, icon_name) in enumerate(catalog):
+            if not icon_name.isascii():
+                self._non_ascii.append(pos)
+                continue
+            key = icon_name.casefold()
+            if key == icon_name:
+                key = icon_name  # share the catalog's string instead of a copy
+            self._exact.setdefault(key, pos)
+            keys.append(key)
+            positions.append(pos)
+        # Stable sort keeps equal keys in catalog order
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._sorted_keys = [keys[i] for i in order]
+        self._sorted_pos = array("L", (positions[i] for i in order))
+
+    def __len__(self) -> int:
+        return len(self._catalog)
+
+    @property
+    def catalog(self) -> CompactCatalog:
+        """The catalog this index was built over."""
+        return self._catalog
+
+    def match(self, pattern: str) -> tuple[str, str] | None:
+        """Return the first ``(pack_id, icon_name)`` whose name fullmatches *pattern*.
+
+        Raises ``re.error`` if *pattern* is not a valid regex.
+        """
+        pos = self._find(pattern)
+        return None if pos is None else self._catalog[pos]
+
+    def _first_match(self, regex: re.Pattern, positions: Iterable[int] | None = None) -> int | None:
+        """Return the first of ascending *positions* (default: all) whose name matches."""
+        for pos, icon_name in self._catalog.iter_names(positions):
+            if regex.fullmatch(icon_name):
+                return pos
+        return None
+
+    def _find(self, pattern: str) -> int | None:
+        ascii_pattern = pattern.isascii()
+
+        if ascii_pattern and _is_literal(pattern):
+            hit = self._exact.get(pattern.casefold())
+            if self._non_ascii:
+                regex = re.compile(re.escape(pattern), re.IGNORECASE)
+                candidates = self._non_ascii if hit is None else [hit, *self._non_ascii]
+                return self._first_match(regex, sorted(candidates))
+            return hit
+
+        regex = re.compile(pattern, re.IGNORECASE)
+
+        prefix = _literal_prefix(pattern) if ascii_pattern else ""
+        if prefix:
+            key = prefix.casefold()
+            lo = bisect_left(self._sorted_keys, key)
+            # Keys are ASCII, so everything starting with key sorts below key + "\x80"
+            hi = bisect_left(self._sorted_keys, key + "\x80", lo)
+            candidates = sorted([*self._sorted_pos[lo:hi], *self._non_ascii])
+            return self._first_match(regex, candidates)
+
+        return self._first_match(regex)
+
+
+# ── Catalog ──────────────────────────────────────────────────────────
+
+
+class IconCatalog:
+    """A run-scoped, lazily built icon catalog.
+
+    The catalog is fetched on first use and then reused for every recipe
+    until :meth:`invalidate` is called (e.g. because the installed icon
+    packs changed).  An empty catalog is never kept, so a failed fetch is
+    retried on the next use.
+
+    :meth:`resolve` memoizes pattern lookups in an LRU keyed by
+    ``(version, pattern)``; :attr:`version` changes every time a new
+    catalog is loaded, so results never outlive the catalog they came from.
+    """
+
+    def __init__(self, client=None, *, use_cache: bool = True):
+        self._client = client
+        self._use_cache = use_cache
+        self._catalog: CompactCatalog | None = None
+        self._index: IconIndex | None = None
+        self._data_path = "data"
+        self._version = 0
+        self._resolve_cached = lru_cache(maxsize=ICON_RESOLVE_CACHE_SIZE)(self._resolve_uncached)
+
+    @classmethod
+    def from_index(cls, index: IconIndex, data_path: str) -> IconCatalog:
+        """Wrap an already built index, e.g. one handed to a worker process.
+
+        The result resolves patterns without talking to StreamController,
+        until it is invalidated or refreshed.
+        """
+        icons = cls(use_cache=False)
+        icons._catalog = index.catalog
+        icons._index = index
+        icons._data_path = data_path
+        icons._version = 1
+        return icons
+
+    @property
+    def version(self) -> int:
+        """Identifies the currently loaded catalog (and its ``DataPath``)."""
+        return self._version
+
+    def load(self) -> tuple[CompactCatalog, str]:
+        """Return ``(catalog, data_path)``, fetching from StreamController if needed."""
+        if self._catalog is not None:
+            log.debug("Reusing icon catalog (%d icon(s))", len(self._catalog))
+            return self._catalog, self._data_path
+
+        catalog, data_path = build_icon_catalog(self._client, use_cache=self._use_cache)
+        if catalog:
+            self._catalog = catalog
+            self._data_path = data_path
+            self._version += 1
+        return catalog, data_path
+
+    def load_index(self) -> tuple[IconIndex, str]:
+        """Return ``(index, data_path)``, building the :class:`IconIndex` once per catalog."""
+        catalog, data_path = self.load()
+        if catalog is not self._catalog:
+            # Fetch failed or came back empty, so there is nothing to keep.
+            return IconIndex(catalog), data_path
+        if self._index is None:
+            self._index = IconIndex(catalog)
+        return self._index, data_path
+
+    def resolve(self, pattern: str) -> str | None:
+        """Return the media path of the first icon matching *pattern*, or *None*.
+
+        Raises ``re.error`` if *pattern* is not a valid regex.
+        """
+        index, data_path = self.load_index()
+        if index is not self._index:
+            # Nothing loaded to key a cache entry on; match without memoizing.
+            return _index_media_path(index, pattern, data_path)
+        return self._resolve_cached(self._version, pattern)
+
+    def _resolve_uncached(self, version: int, pattern: str) -> str | None:
+        return _index_media_path(self._index, pattern, self._data_path)
+
+    def log_cache_stats(self) -> None:
+        """Log hit/miss counts of the pattern resolution cache at debug level."""
+        info = self._resolve_cached.cache_info()
+        log.debug(
+            "Icon pattern cache: %d hit(s), %d miss(es), %d entr(ies)",
+            info.hits,
+            info.misses,
+            info.currsize,
+        )
+
+    def invalidate(self) -> None:
+        """Drop the cached catalog so the next :meth:`load` refetches it."""
+        if self._catalog is not None:
+            log.info("Icon catalog invalidated")
+        self._catalog = None
+        self._index = None
+
+    def refresh(self) -> list[str]:
+        """Rebuild the catalog now, updating the on-disk cache.
+
+        Only packs that were added since the last build are fetched over
+        DBus; removed packs are pruned from the cache.
+
+        Returns the IDs of packs that were not in the previous catalog.
+        """
+        old_packs = set(self._catalog.pack_ids()) if self._catalog is not None else set()
+        self.invalidate()
+        catalog, _ = self.load()
+        added = [p for p in catalog.pack_ids() if p not in old_packs]
+        if added:
+            log.info("New icon pack(s): %s", added)
+        return added
+
+    def index_for_packs(self, pack_ids: Iterable[str]) -> IconIndex:
+        """Build an :class:`IconIndex` over just the given packs of the current catalog."""
+        catalog, _ = self.load()
+        return IconIndex(catalog.select(pack_ids))
+
+
+def _index_media_path(index: IconIndex, pattern: str, data_path: str) -> str | None:
+    hit = index.match(pattern)
+    return None if hit is None else icon_media_path(data_path, *hit)
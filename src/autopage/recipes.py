@@ -0,0 +1,353 @@
+"""Concurrent, cached discovery of autopage recipes.
+
+toml-repo walks a recipe index one ``repo-ref`` at a time, so discovery
+time grows with recipe count × fetch latency.  :func:`discover_recipes`
+walks the same index with toml-repo's own ``Repo`` class -- so config
+loading, ``[import]`` tables, ``repo-ref`` resolution and kind inference
+follow toml-repo exactly -- but reads files through a hook that fetches
+sibling recipes in parallel on a bounded thread pool.  Discovered recipes
+are returned in toml-repo's depth-first index order, whatever order the
+fetches finish in.
+
+A :class:`RecipeCache` keeps every fetched recipe under
+``$XDG_CACHE_HOME/autopage`` together with its ``ETag``/``Last-Modified``
+validators, so unchanged recipes revalidate with a bodiless 304 and
+discovery keeps working offline.  :func:`discover_recipes_cached` starts
+from that cache straight away and revalidates it on a background thread.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import unquote, urlparse
+
+from autopage.cache import cache_path, load_json, save_json
+
+log = logging.getLogger(__name__)
+
+# File name suffix of recipe and index configs (also given to toml-repo)
+CONFIG_SUFFIX = "ap.toml"
+# Recipe fetches in flight at once during concurrent discovery
+DISCOVERY_WORKERS = 8
+# Seconds before a single recipe fetch is abandoned
+FETCH_TIMEOUT = 15.0
+# Layout version of the recipe cache file (see autopage.cache)
+RECIPE_CACHE_VERSION = 1
+
+
+class RecipeRepo(NamedTuple):
+    """A discovered config, exposing the ``url``/``config`` pair of a toml-repo Repo."""
+
+    url: str
+    config: dict
+
+
+def content_digest(text: str) -> str:
+    """Return the SHA-256 hex digest identifying a config's source text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def config_url(url: str) -> str:
+    """Return the URL of the config file for repo *url*."""
+    if _is_config_file(url):
+        return url
+    return f"{url.rstrip('/')}/{CONFIG_SUFFIX}"
+
+
+def _is_config_file(url: str) -> bool:
+    """Whether *url* names a config file itself rather than a directory."""
+    return url.endswith(".toml")
+
+
+# ── Recipe cache ─────────────────────────────────────────────────────
+
+
+class RecipeCache:
+    """Fetched recipe texts and their HTTP validators, persisted between runs.
+
+    Thread-safe, so one cache can serve a whole discovery pool.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or cache_path("recipes.json")
+        self._entries: dict[str, dict[str, str | None]] = self._load()
+        self._lock = threading.Lock()
+        self._dirty = False
+        # URLs answered from the cache without asking the server
+        self.stale: set[str] = set()
+        # URLs whose content changed since they were cached
+        self.changed: set[str] = set()
+        # Background revalidation started by discover_recipes_cached(), if any
+        self.revalidation: threading.Thread | None = None
+
+    def _load(self) -> dict[str, dict[str, str | None]]:
+        doc = load_json(self.path, RECIPE_CACHE_VERSION, "recipe cache")
+        return dict(doc.get("entries", {})) if doc else {}
+
+    def save(self) -> None:
+        """Atomically write the cache, if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            doc = {"version": RECIPE_CACHE_VERSION, "entries": dict(self._entries)}
+            self._dirty = False
+        try:
+            save_json(self.path, doc)
+        except (OSError, TypeError, ValueError) as exc:
+            log.warning("Could not write recipe cache %s: %s", self.path, exc)
+
+    def fetch(self, url: str, *, revalidate: bool = True, timeout: float = FETCH_TIMEOUT) -> str:
+        """Return the text at *url*, using the cache as far as allowed.
+
+        Without *revalidate* a cached copy is returned as-is.  Otherwise a
+        conditional GET is sent: a 304 reuses the cached text, and if the
+        server cannot be reached the cached text is served (stale) instead
+        of failing.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is not None and not revalidate:
+            with self._lock:
+                self.stale.add(url)
+            return entry["body"]
+
+        request = urllib.request.Request(url)
+        if entry is not None:
+            if entry.get("etag"):
+                request.add_header("If-None-Match", entry["etag"])
+            if entry.get("last_modified"):
+                request.add_header("If-Modified-Since", entry["last_modified"])
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                body = response.read().decode("utf-8")
+                headers = response.headers
+        except urllib.error.HTTPError as exc:
+            if exc.code == 304 and entry is not None:
+                log.debug("Recipe %s not modified", url)
+                return entry["body"]
+            raise
+        except OSError as exc:
+            if entry is None:
+                raise
+            log.warning("Could not reach %s (%s), using cached copy", url, exc)
+            return entry["body"]
+
+        with self._lock:
+            if entry is not None and entry["body"] != body:
+                self.changed.add(url)
+            self._entries[url] = {
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "body": body,
+            }
+            self._dirty = True
+        return body
+
+
+# ── Discovery ────────────────────────────────────────────────────────
+
+
+def fetch_text(
+    url: str,
+    timeout: float = FETCH_TIMEOUT,
+    *,
+    cache: RecipeCache | None = None,
+    revalidate: bool = True,
+) -> str:
+    """Read a ``file://`` or ``http(s)://`` URL as UTF-8 text.
+
+    Remote URLs go through *cache* when one is given (see
+    :meth:`RecipeCache.fetch`); local files are always read directly.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        with open(unquote(parsed.path), encoding="utf-8") as f:
+            return f.read()
+    if cache is not None:
+        return cache.fetch(url, revalidate=revalidate, timeout=timeout)
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read().decode("utf-8")
+
+
+def _base_url(url: str) -> str:
+    """Return the directory URL that paths in the repo at *url* are relative to."""
+    return url.rsplit("/", 1)[0] if _is_config_file(url) else url.rstrip("/")
+
+
+def _fetching_repo_type(read):
+    """Return a toml-repo ``Repo`` subclass that reads files through *read*.
+
+    ``Repo.read()`` is toml-repo's one hook for loading files; routing it
+    through *read* (a file URL -> text callable) lets a whole walk share
+    autopage's thread pool, recipe cache and source digests, while config
+    loading, ``[import]`` resolution, ``repo-ref`` resolution and kind
+    inference all stay toml-repo's own.
+    """
+    from toml_repo import Repo
+
+    class FetchingRepo(Repo):
+        def read(self, filepath: str) -> str:
+            if not (self.is_scheme("file") or self.is_scheme("http") or self.is_scheme("https")):
+                return super().read(filepath)  # pkg:// resources
+            if not filepath:
+                return read(self.url)
+            if self.is_scheme("file") and os.path.isabs(filepath):
+                return read(Path(filepath).as_uri())
+            return read(f"{_base_url(self.url)}/{filepath.lstrip('/')}")
+
+        def _resolve_import_node(self, node_path, file_path, repo_spec):
+            if repo_spec:
+                # toml-repo would load the other repo with its own reader
+                source = FetchingRepo(repo_spec)
+                return source._resolve_import_node(node_path, file_path, None)
+            return super()._resolve_import_node(node_path, file_path, repo_spec)
+
+    return FetchingRepo
+
+
+class _RefCollector:
+    """Stands in for a toml-repo ``RepoManager`` to collect the URLs of a repo's refs."""
+
+    def __init__(self):
+        self.urls: list[str] = []
+
+    def add_repo(self, url: str) -> None:
+        self.urls.append(url)
+
+
+def _ref_urls(repo) -> list[str]:
+    """Resolve the ``[[repo-ref]]`` entries of *repo* exactly as toml-repo does."""
+    collector = _RefCollector()
+    repo.add_by_repo_refs(collector)
+    return collector.urls
+
+
+def discover_recipes(
+    base_url: str,
+    kind: str,
+    *,
+    workers: int = DISCOVERY_WORKERS,
+    cache: RecipeCache | None = None,
+    revalidate: bool = True,
+    sources: dict[str, str] | None = None,
+    prefetched: dict[str, str] | None = None,
+) -> list:
+    """Walk the index at *base_url* and return every toml-repo ``Repo`` of *kind*.
+
+    The result is what toml-repo's ``RepoManager`` finds, in the same
+    depth-first order, but the children of each config are fetched
+    concurrently (at most *workers* at a time) as soon as their parent has
+    been read.  A child that cannot be fetched or parsed is logged and
+    skipped; a failing root raises.  *cache* and *revalidate* are passed on
+    to :func:`fetch_text`.
+
+    If *sources* is given, it is filled with the :func:`content_digest` of
+    every file read (index, recipes and imports alike), keyed by file URL.
+    Texts in *prefetched* (also keyed by file URL) are used instead of
+    fetching those files again.
+    """
+    from toml_repo import set_config_suffix
+
+    set_config_suffix(CONFIG_SUFFIX)
+    found: list = []
+
+    def read(url: str) -> str:
+        text = prefetched.get(url) if prefetched else None
+        if text is None:
+            text = fetch_text(url, cache=cache, revalidate=revalidate)
+        if sources is not None:
+            sources[url] = content_digest(text)
+        return text
+
+    repo_type = _fetching_repo_type(read)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        loading: dict[str, Future] = {}
+
+        def load(url: str) -> Future:
+            if url not in loading:
+                loading[url] = pool.submit(repo_type, url)
+            return loading[url]
+
+        def walk(url: str, ancestors: frozenset[str]) -> None:
+            try:
+                repo = load(url).result()
+            except Exception as exc:
+                if url == base_url:
+                    raise
+                log.error("Error fetching recipe %s: %s", url, exc)
+                return
+
+            if repo.kind() == kind:
+                found.append(repo)
+
+            # A ref back to an ancestor would make toml-repo recurse forever
+            children = [child for child in _ref_urls(repo) if child not in ancestors]
+            # Queue every sibling before descending, so they download together
+            for child in children:
+                load(child)
+            for child in children:
+                walk(child, ancestors | {child})
+
+        walk(base_url, frozenset({base_url}))
+
+    return found
+
+
+def discover_recipes_cached(
+    base_url: str,
+    kind: str,
+    *,
+    workers: int = DISCOVERY_WORKERS,
+    cache: RecipeCache | None = None,
+) -> list:
+    """Like :func:`discover_recipes`, but answered from the recipe cache first.
+
+    Cached recipes are used without contacting the server, so startup is
+    instant and works offline; only recipes missing from the cache are
+    downloaded.  If anything was served from the cache, the whole index is
+    then revalidated with conditional GETs on a (non-daemon) background
+    thread, available as ``cache.revalidation``, which updates the cache
+    for the next run.
+    """
+    cache = cache if cache is not None else RecipeCache()
+    repos = discover_recipes(base_url, kind, workers=workers, cache=cache, revalidate=False)
+    if not cache.stale:
+        cache.save()
+        return repos
+
+    revalidate_in_background(base_url, kind, cache, workers=workers)
+    return repos
+
+
+def revalidate_in_background(
+    base_url: str, kind: str, cache: RecipeCache, *, workers: int = DISCOVERY_WORKERS
+) -> threading.Thread:
+    """Revalidate the cached index at *base_url* on a (non-daemon) thread.
+
+    The thread is also stored as ``cache.revalidation``.
+    """
+    log.debug("Served %d recipe file(s) from cache, revalidating", len(cache.stale))
+    cache.revalidation = threading.Thread(
+        target=_revalidate, args=(base_url, kind, workers, cache), name="recipe-revalidate"
+    )
+    cache.revalidation.start()
+    return cache.revalidation
+
+
+def _revalidate(base_url: str, kind: str, workers: int, cache: RecipeCache) -> None:
+    try:
+        discover_recipes(base_url, kind, workers=workers, cache=cache)
+    except Exception as exc:
+        log.warning("Could not revalidate recipes from %s: %s", base_url, exc)
+    if cache.changed:
+        log.info("%d recipe file(s) changed upstream, used from next run", len(cache.changed))
+    cache.save()
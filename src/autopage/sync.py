@@ -0,0 +1,60 @@
+"""Content hashes of the pages autopage has pushed, for incremental sync.
+
+StreamController cannot hand a page's JSON back, so autopage records the
+SHA-256 of every page it pushes under ``$XDG_CACHE_HOME/autopage``.  With
+``--sync`` a page that is already on the controller is only replaced if
+its newly generated JSON hashes differently from what was last pushed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from pathlib import Path
+
+from autopage.cache import cache_path, load_json, save_json
+
+log = logging.getLogger(__name__)
+
+# Layout version of the page state file (see autopage.cache)
+PAGE_STATE_VERSION = 1
+
+
+def page_digest(page_json: str) -> str:
+    """Return the SHA-256 hex digest of a generated page."""
+    return hashlib.sha256(page_json.encode("utf-8")).hexdigest()
+
+
+class PageHashes:
+    """Digest of the JSON last pushed for each page, persisted between runs."""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or cache_path("pages.json")
+        self._pages: dict[str, str] = self._load()
+        self._dirty = False
+
+    def _load(self) -> dict[str, str]:
+        doc = load_json(self.path, PAGE_STATE_VERSION, "page state")
+        return dict(doc.get("pages", {})) if doc else {}
+
+    def unchanged(self, page_name: str, page_json: str) -> bool:
+        """Return True if *page_json* is exactly what was last pushed as *page_name*."""
+        return self._pages.get(page_name) == page_digest(page_json)
+
+    def record(self, page_name: str, page_json: str) -> None:
+        """Remember that *page_json* was pushed as *page_name*."""
+        digest = page_digest(page_json)
+        if self._pages.get(page_name) != digest:
+            self._pages[page_name] = digest
+            self._dirty = True
+
+    def save(self) -> None:
+        """Atomically write the state, if anything changed."""
+        if not self._dirty:
+            return
+        doc = {"version": PAGE_STATE_VERSION, "pages": self._pages}
+        try:
+            save_json(self.path, doc)
+            self._dirty = False
+        except (OSError, TypeError, ValueError) as exc:
+            log.warning("Could not write page state %s: %s", self.path, exc)
@@ -0,0 +1,168 @@
+"""Shared pytest fixtures."""
+
+import os
+import shutil
+import sys
+import threading
+import time
+import types
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+
+from autopage.fake_service import FakeConfig, FakeServiceProcess, PrivateBus
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache(tmp_path, monkeypatch):
+    """Keep tests from reading or writing the user's real autopage cache."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def icon_client():
+    """Return a factory for mock StreamController clients serving icon packs.
+
+    ``icon_client(packs, data_path="data")`` reports the packs of *packs*
+    (``{pack_id: icon names}``, default one ``pack_a`` with ``home`` and
+    ``star``) and answers ``get_icon_names`` from it.
+    """
+
+    def make(packs: dict[str, list[str]] | None = None, data_path: str = "data") -> MagicMock:
+        packs = {"pack_a": ["home", "star"]} if packs is None else packs
+        client = MagicMock()
+        client.get_data_path.return_value = data_path
+        client.get_icon_packs.return_value = list(packs)
+        client.get_icon_names.side_effect = lambda pack_id, timeout=None: packs[pack_id]
+        return client
+
+    return make
+
+
+@pytest.fixture
+def mock_glib(monkeypatch):
+    """Replace ``gi.repository`` with mocks for unit tests of the DBus client.
+
+    Works without PyGObject installed.  ``MainContext.invoke_full`` runs its
+    function at once and ``MainLoop.run`` returns immediately, so nothing
+    waits on a real main loop.  Returns the mocked ``GLib``.
+    """
+    glib = MagicMock()
+    context = glib.MainContext.new.return_value
+    context.invoke_full.side_effect = lambda priority, function, *args: function(*args)
+    repository = types.ModuleType("gi.repository")
+    repository.GLib = glib
+    repository.Gio = MagicMock()
+    gi = types.ModuleType("gi")
+    gi.repository = repository
+    monkeypatch.setitem(sys.modules, "gi", gi)
+    monkeypatch.setitem(sys.modules, "gi.repository", repository)
+    return glib
+
+
+@pytest.fixture(scope="session")
+def private_bus():
+    """A private dbus-daemon session bus shared by the whole test run."""
+    if shutil.which("dbus-daemon") is None:
+        pytest.skip("dbus-daemon is not installed")
+    with PrivateBus() as bus:
+        yield bus
+
+
+@pytest.fixture
+def fake_streamcontroller(request, private_bus, monkeypatch):
+    """Run a fake StreamController on the private bus for one test.
+
+    Pass :class:`FakeConfig` fields with indirect parametrization, e.g.
+    ``@pytest.mark.parametrize("fake_streamcontroller", [{"latency_ms": 5}], indirect=True)``.
+    ``api_client.get_client()`` returns a fresh client connected to it.
+    """
+    pytest.importorskip("gi")
+    pytest.importorskip("dasbus")
+    from autopage import api_client
+
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", private_bus.address)
+    monkeypatch.setattr(api_client, "_singleton_client", None)
+    config = FakeConfig(**getattr(request, "param", {}))
+    with FakeServiceProcess(private_bus.address, config) as service:
+        yield service
+
+
+class RecipeServer:
+    """Serves a directory over HTTP on localhost, recording what is fetched.
+
+    Files carry an ``ETag`` (and ``Last-Modified``), and conditional GETs
+    for unchanged files are answered with 304.
+    """
+
+    def __init__(self, root, delay: float = 0.0):
+        self.root = root
+        self.delay = delay
+        self.requests: list[str] = []
+        self.responses: list[tuple[str, int]] = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=str(server.root), **kwargs)
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append(self.path)
+                    server._in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server._in_flight)
+                try:
+                    time.sleep(server.delay)
+                    self.etag = None
+                    path = self.translate_path(self.path)
+                    if os.path.isfile(path):
+                        st = os.stat(path)
+                        self.etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+                        if self.headers.get("If-None-Match") == self.etag:
+                            self.send_response(304)
+                            self.end_headers()
+                            return
+                    super().do_GET()
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+            def end_headers(self):
+                if self.etag:
+                    self.send_header("ETag", self.etag)
+                super().end_headers()
+
+            def log_request(self, code="-", size="-"):
+                with server._lock:
+                    server.responses.append((self.path, int(code)))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "RecipeServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def recipe_server(tmp_path):
+    """A local HTTP stand-in for the recipe index, serving ``tmp_path / "recipes"``."""
+    root = tmp_path / "recipes"
+    root.mkdir()
+    server = RecipeServer(root).start()
+    yield server
+    server.stop()
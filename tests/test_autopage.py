@@ -1,11 +1,14 @@
 """Tests for autopage."""
 
 import json
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, call
+
+import pytest
 
 from autopage import __version__
 from autopage.cli import main
 from autopage.engine import _match_icon, _resolve_icons
+from autopage.icons import CompactCatalog, IconCatalog, IconIndex
 from autopage.json import (
     DEFAULT_OPACITY,
     _parse_color,
@@ -13,7 +16,7 @@ from autopage.json import (
     page_json_to_string,
 )
 from autopage.keys import type_string_to_keys
-from autopage.toml import AutopageDef, Button, parse_toml_string
+from autopage.toml import AutopageDef, Button, parse_toml_dict, parse_toml_string
 
 # ── Version / CLI ────────────────────────────────────────────────────
 
@@ -54,6 +57,79 @@ def test_cli_dry_run(capsys, tmp_path):
     assert "keys" in page
 
 
+# Per CLI mode: modules it must not import, and a budget (ms) for the total
+# self-time of everything it does import.  The budgets are deliberately loose
+# (CI machines vary); the forbidden-module lists are the strict check.
+_HEAVY_IMPORTS = {"autopage.engine", "tomlkit", "webcolors", "dasbus", "gi", "toml_repo"}
+_STARTUP_MODES = {
+    "autopage --help": ("autopage.cli", ["--help"], _HEAVY_IMPORTS, 100),
+    "autopage --version": ("autopage.cli", ["--version"], _HEAVY_IMPORTS, 100),
+    "autopage --dry-run": (
+        "autopage.cli",
+        ["--dry-run", "FILE"],
+        {"toml_repo", "autopage.bundle", "autopage.recipes", "urllib.request", "ssl"},
+        400,
+    ),
+    "streamclient --help": ("autopage.api_client", ["--help"], {"dasbus", "gi"}, 100),
+}
+
+_IMPORT_PROBE = """\
+import json, sys
+before = set(sys.modules)
+module, out, *argv = sys.argv[1:]
+sys.argv = ["prog", *argv]
+main = __import__(module, fromlist=["main"]).main
+try:
+    main()
+except SystemExit:
+    pass
+with open(out, "w") as f:
+    json.dump(sorted(set(sys.modules) - before), f)
+"""
+
+
+@pytest.mark.parametrize("mode", list(_STARTUP_MODES))
+def test_cli_import_budget(mode, tmp_path):
+    """Each CLI mode imports only what it needs, measured with -X importtime."""
+    import os
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    module, argv, forbidden, budget_ms = _STARTUP_MODES[mode]
+    toml_file = tmp_path / "test.ap.toml"
+    toml_file.write_text('[[button]]\ncenter = "hi"\n[[button.actions]]\ntype = "Ctrl+C"\n')
+    argv = [str(toml_file) if arg == "FILE" else arg for arg in argv]
+    loaded_file = tmp_path / "loaded.json"
+
+    src = str(Path(__file__).resolve().parent.parent / "src")
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")])),
+        # Fail fast instead of talking to a real StreamController
+        DBUS_SESSION_BUS_ADDRESS="unix:path=/nonexistent",
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _IMPORT_PROBE, module, str(loaded_file), *argv],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=60,
+    )
+    loaded = set(json.loads(loaded_file.read_text()))
+
+    assert not {name for name in loaded if name.split(".")[0] in forbidden or name in forbidden}
+
+    # "import time: self [us] | cumulative | imported package"
+    self_us = 0
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            fields = line.removeprefix("import time:").split("|")
+            if fields[2].strip() in loaded and fields[0].strip().isdigit():
+                self_us += int(fields[0])
+    assert self_us / 1000 < budget_ms
+
+
 # ── TOML parsing ─────────────────────────────────────────────────────
 
 
@@ -225,6 +301,45 @@ def test_page_json_roundtrip():
     assert reloaded == page
 
 
+# ── On-disk caches ───────────────────────────────────────────────────
+
+
+def test_save_json_concurrent_writers_never_clash(tmp_path):
+    """Simultaneous saves each go through their own temp file; the result is always whole."""
+    import threading
+
+    from autopage.cache import load_json, save_json
+
+    path = tmp_path / "state.json"
+
+    def writer(n: int) -> None:
+        for i in range(50):
+            save_json(path, {"version": 1, "writer": n, "payload": [i] * 200})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    doc = load_json(path, 1, "state")
+    assert doc is not None and len(doc["payload"]) == 200
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_save_json_failure_keeps_old_file(tmp_path):
+    """A failing save leaves the previous file and no temp file behind."""
+    from autopage.cache import load_json, save_json
+
+    path = tmp_path / "state.json"
+    save_json(path, {"version": 1, "ok": True})
+    with pytest.raises(TypeError):
+        save_json(path, {"version": 1, "bad": object()})
+    assert load_json(path, 1, "state") == {"version": 1, "ok": True}
+    assert load_json(path, 2, "state") is None
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
 # ── Icon resolution ──────────────────────────────────────────────────
 
 
@@ -287,7 +402,7 @@ def test_match_icon_bare_name():
     assert result == "data/icons/pack_a/icons/home.png"
 
 
-def test_resolve_icons_updates_buttons():
+def test_resolve_icons_updates_buttons(icon_client):
     """_resolve_icons replaces icon patterns with resolved paths."""
     defn = AutopageDef(
         buttons=[
@@ -297,10 +412,7 @@ def test_resolve_icons_updates_buttons():
         ]
     )
 
-    mock_client = MagicMock()
-    mock_client.get_data_path.return_value = "data"
-    mock_client.get_icon_packs.return_value = ["com_core447_MaterialIcons"]
-    mock_client.get_icon_names.return_value = ["home", "textsms", "star"]
+    mock_client = icon_client({"com_core447_MaterialIcons": ["home", "textsms", "star"]})
 
     _resolve_icons(defn, client=mock_client)
 
@@ -309,15 +421,1161 @@ def test_resolve_icons_updates_buttons():
     assert defn.buttons[2].icon is None  # no icon, unchanged
 
 
-def test_resolve_icons_api_failure_is_graceful():
+def test_resolve_icons_api_failure_is_graceful(icon_client):
     """If the StreamController API is unavailable, icons are dropped."""
     defn = AutopageDef(buttons=[Button(icon="home")])
 
-    mock_client = MagicMock()
-    mock_client.get_data_path.return_value = "data"
+    mock_client = icon_client()
     mock_client.get_icon_packs.side_effect = Exception("no dbus")
 
     _resolve_icons(defn, client=mock_client)
 
     # Icon catalog fetch failed, so no icons are resolved and buttons keep their patterns
     assert defn.buttons[0].icon == "home"  # unchanged when catalog fetch fails
+
+
+def test_icon_catalog_is_fetched_once_and_shared(icon_client):
+    """A shared IconCatalog only hits the API once across many definitions."""
+    mock_client = icon_client()
+
+    icons = IconCatalog(mock_client)
+    defs = [AutopageDef(buttons=[Button(icon="home")]) for _ in range(3)]
+    for defn in defs:
+        _resolve_icons(defn, icons=icons)
+
+    assert mock_client.get_icon_packs.call_count == 1
+    assert mock_client.get_icon_names.call_count == 1
+    assert all(d.buttons[0].icon == "data/icons/pack_a/icons/home.png" for d in defs)
+
+
+def test_icon_catalog_invalidate_refetches(icon_client):
+    """invalidate() forces the next load to fetch from the API again."""
+    mock_client = icon_client()
+
+    icons = IconCatalog(mock_client)
+    icons.load()
+    icons.load()
+    icons.invalidate()
+    icons.load()
+
+    assert mock_client.get_icon_packs.call_count == 2
+
+
+def test_icon_cache_only_fetches_new_packs(icon_client):
+    """A cold start reuses cached packs and only fetches newly installed ones."""
+    IconCatalog(icon_client({"pack_a": ["a"], "pack_b": ["b"]})).load()
+
+    second = icon_client({"pack_a": ["changed"], "pack_c": ["next"]})
+    catalog, _ = IconCatalog(second).load()
+
+    assert [c.args[0] for c in second.get_icon_names.call_args_list] == ["pack_c"]
+    assert list(catalog) == [("pack_a", "a"), ("pack_c", "next")]
+
+
+def test_icon_cache_discarded_when_data_path_changes(icon_client):
+    """Cached icon names are not reused across a DataPath change."""
+    client = icon_client()
+    IconCatalog(client).load()
+
+    client.get_data_path.return_value = "/other/data"
+    IconCatalog(client).load()
+
+    assert client.get_icon_names.call_count == 2
+
+
+def test_icon_index_keeps_catalog_order():
+    """Every index tier returns the first match in catalog order, not sorted order."""
+    catalog = [
+        ("pack_a", "arrow_zz"),
+        ("pack_a", "Home"),
+        ("pack_b", "arrow_aa"),
+        ("pack_b", "home"),
+        ("pack_b", "star"),
+    ]
+    index = IconIndex(catalog)
+    assert index.match("HOME") == ("pack_a", "Home")  # exact tier
+    assert index.match("arrow_.*") == ("pack_a", "arrow_zz")  # prefix tier
+    assert index.match(".*_aa") == ("pack_b", "arrow_aa")  # regex scan
+    assert index.match("st?ar") == ("pack_b", "star")  # optional char ends the prefix
+    assert index.match("home|star") == ("pack_a", "Home")  # alternation has no prefix
+    assert index.match("missing") is None
+
+
+def test_icon_index_matches_linear_scan():
+    """The index agrees with a plain case-insensitive fullmatch scan."""
+    import re
+
+    catalog = [("p", n) for n in ["content_copy", "Content_Paste", "copy", "arrow-left", "ſtar"]]
+    index = IconIndex(catalog)
+    for pattern in ["content_copy", "content_.*", "CONTENT_P.*", "arrow-left", "star", "c.py", ""]:
+        expected = next((e for e in catalog if re.fullmatch(pattern, e[1], re.IGNORECASE)), None)
+        assert index.match(pattern) == expected, pattern
+
+
+def test_resolve_icons_bulk_evaluates_each_pattern_once(monkeypatch, icon_client):
+    """Shared patterns across definitions are matched once and applied everywhere."""
+    from autopage import engine
+
+    mock_client = icon_client()
+
+    calls = []
+    real_match = IconIndex.match
+    monkeypatch.setattr(IconIndex, "match", lambda self, p: calls.append(p) or real_match(self, p))
+
+    defs = [
+        AutopageDef(buttons=[Button(icon="home"), Button(icon="star")]),
+        AutopageDef(buttons=[Button(icon="home"), Button(icon="nope"), Button(icon="(")]),
+    ]
+    engine._resolve_icons_bulk(defs, client=mock_client)
+
+    assert sorted(calls) == ["(", "home", "nope", "star"]
+    assert defs[1].buttons[0].icon == "data/icons/pack_a/icons/home.png"
+    assert defs[0].buttons[1].icon == "data/icons/pack_a/icons/star.png"
+    assert defs[1].buttons[1].icon is None  # no match
+    assert defs[1].buttons[2].icon is None  # invalid regex
+
+
+def test_icon_packs_fetched_concurrently_keep_pack_order(icon_client):
+    """Slow and failing packs do not reorder or block the rest of the catalog."""
+    import time
+
+    def get_icon_names(pack_id, timeout=None):
+        if pack_id == "broken":
+            raise Exception("timed out")
+        if pack_id == "slow":
+            time.sleep(0.05)
+        return [f"{pack_id}_icon"]
+
+    mock_client = icon_client(dict.fromkeys(["slow", "broken", "fast"], []))
+    mock_client.get_icon_names.side_effect = get_icon_names
+
+    catalog, _ = IconCatalog(mock_client).load()
+
+    assert list(catalog) == [("slow", "slow_icon"), ("fast", "fast_icon")]
+
+
+def test_icon_catalog_reads_local_data_path(tmp_path, icon_client):
+    """Packs under a local DataPath are listed from disk; unreadable ones use DBus."""
+    icons_dir = tmp_path / "icons" / "pack_a" / "icons"
+    icons_dir.mkdir(parents=True)
+    (icons_dir / "home.png").write_bytes(b"")
+
+    mock_client = icon_client({"pack_a": [], "pack_b": ["star"]}, data_path=str(tmp_path))
+
+    catalog, _ = IconCatalog(mock_client).load()
+
+    assert list(catalog) == [("pack_a", "home"), ("pack_b", "star")]
+    assert [c.args[0] for c in mock_client.get_icon_names.call_args_list] == ["pack_b"]
+
+
+def _write_icon_pack(data_path, pack_id):
+    """Lay out an icon pack with PNGs in shuffled order, plus files that are not icons."""
+    icons_dir = data_path / "icons" / pack_id / "icons"
+    icons_dir.mkdir(parents=True)
+    for name in ("zoom_in.png", "add.png", "Menu.png", "home.png", "home-inv.png", ".hidden.png"):
+        (icons_dir / name).write_bytes(b"")
+    (icons_dir / "notes.txt").write_text("not an icon")
+    (icons_dir / "README").write_text("not an icon")
+
+
+def test_scan_icon_names_lists_sorted_pngs(tmp_path):
+    """Only visible *.png files count, in sorted order, as GetIconNames lists them."""
+    from autopage.fake_service import _icon_packs_on_disk
+    from autopage.icons import _scan_icon_names
+
+    _write_icon_pack(tmp_path, "pack_a")
+    expected = ["Menu", "add", "home-inv", "home", "zoom_in"]
+    assert _scan_icon_names(str(tmp_path), "pack_a") == expected
+    assert _icon_packs_on_disk(str(tmp_path)) == {"pack_a": expected}
+    assert _scan_icon_names(str(tmp_path), "missing") is None
+
+
+def test_scan_icon_names_matches_recorded_get_icon_names(tmp_path):
+    """The scan reproduces a real GetIconNames listing (doc/all-icons.txt) exactly."""
+    import random
+    from pathlib import Path
+
+    from autopage.fake_service import _icon_packs_on_disk
+    from autopage.icons import _scan_icon_names
+
+    recorded = (Path(__file__).parent.parent / "doc" / "all-icons.txt").read_text().split()
+    icons_dir = tmp_path / "icons" / "pack" / "icons"
+    icons_dir.mkdir(parents=True)
+    for name in random.Random(0).sample(recorded, len(recorded)):
+        (icons_dir / f"{name}.png").write_bytes(b"")
+
+    assert _scan_icon_names(str(tmp_path), "pack") == recorded
+    assert _icon_packs_on_disk(str(tmp_path)) == {"pack": recorded}
+
+
+def test_scan_icon_names_matches_dbus(private_bus, tmp_path, monkeypatch):
+    """Reading a local DataPath gives exactly what the service returns over DBus."""
+    pytest.importorskip("gi")
+    pytest.importorskip("dasbus")
+    from autopage import api_client
+    from autopage.fake_service import FakeConfig, FakeServiceProcess
+    from autopage.icons import _scan_icon_names
+
+    _write_icon_pack(tmp_path, "pack_a")
+    _write_icon_pack(tmp_path, "pack_b")
+    (tmp_path / "icons" / "pack_b" / "icons" / "arrow.png").write_bytes(b"")
+
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", private_bus.address)
+    monkeypatch.setattr(api_client, "_singleton_client", None)
+    with FakeServiceProcess(private_bus.address, FakeConfig(data_path=str(tmp_path))):
+        client = api_client.get_client()
+        assert client.get_icon_packs() == ["pack_a", "pack_b"]
+        for pack_id in ("pack_a", "pack_b"):
+            assert _scan_icon_names(str(tmp_path), pack_id) == client.get_icon_names(pack_id)
+
+
+def test_compact_catalog_behaves_like_a_list_of_pairs():
+    """CompactCatalog iterates, indexes and interns like the old tuple list."""
+    pairs = [("pack_a", "home"), ("pack_a", "star"), ("pack_b", "home"), ("pack_a", "next")]
+    catalog = CompactCatalog.from_pairs(pairs)
+
+    assert len(catalog) == 4
+    assert list(catalog) == pairs
+    assert catalog[2] == ("pack_b", "home")
+    assert catalog[-1] == ("pack_a", "next")
+    assert catalog.name(1) == "star"
+    assert catalog[0][1] is catalog[2][1]  # repeated names share one string
+    assert list(CompactCatalog({"p": ["a", "b"], "q": []})) == [("p", "a"), ("p", "b")]
+    assert list(catalog.iter_names()) == [(i, name) for i, (_, name) in enumerate(pairs)]
+    sparse = CompactCatalog({"p": ["a"], "q": [], "r": ["b", "c"]})
+    assert list(sparse.iter_names([0, 2])) == [(0, "a"), (2, "c")]
+
+
+def test_icon_catalog_memoizes_resolution_per_version(monkeypatch, icon_client):
+    """Repeated resolution hits the LRU until the catalog is reloaded."""
+    mock_client = icon_client()
+
+    calls = []
+    real_match = IconIndex.match
+    monkeypatch.setattr(IconIndex, "match", lambda self, p: calls.append(p) or real_match(self, p))
+
+    icons = IconCatalog(mock_client, use_cache=False)
+    assert icons.resolve("home") == "data/icons/pack_a/icons/home.png"
+    assert icons.resolve("home") == "data/icons/pack_a/icons/home.png"
+    assert icons.resolve("missing") is None
+    assert icons.resolve("missing") is None
+    assert calls == ["home", "missing"]
+
+    version = icons.version
+    icons.refresh()
+    assert icons.version != version
+    icons.resolve("home")
+    assert calls == ["home", "missing", "home"]
+
+
+def test_new_icon_pack_only_reresolves_dropped_patterns(icon_client):
+    """After a pack is installed, only pages whose dropped icons it provides are rebuilt."""
+    from autopage.engine import _pages_gaining_icons
+
+    mock_client = icon_client({"pack_a": ["home"], "pack_b": ["rocket", "home"]})
+    mock_client.get_icon_packs.return_value = ["pack_a"]
+
+    icons = IconCatalog(mock_client, use_cache=False)
+    defn = AutopageDef(buttons=[Button(icon="home"), Button(icon="rocket")])
+    assert _resolve_icons(defn, icons=icons) == {"rocket"}
+    assert defn.buttons[1].icon is None
+
+    mock_client.get_icon_packs.return_value = ["pack_a", "pack_b"]
+    added = icons.refresh()
+    assert added == ["pack_b"]
+
+    unresolved_by_page = {"code": {"rocket"}, "kwrite": {"nope", "(bad"}}
+    assert _pages_gaining_icons(unresolved_by_page, icons, added) == ["code"]
+
+
+# ── API client ───────────────────────────────────────────────────────
+
+
+def _resolved(value=None, exc=None):
+    from concurrent.futures import Future
+
+    future = Future()
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(value)
+    return future
+
+
+def test_client_caches_proxies_until_owner_changes(mock_glib):
+    """Proxies are built once per object and dropped when the service restarts."""
+    from autopage import api_client
+
+    bus = MagicMock()
+    client = api_client.AsyncStreamControllerClient(bus)
+
+    assert client._root_proxy() is client._root_proxy()
+    assert client._controller_proxy("ABC-1") is client._controller_proxy("ABC-1")
+    assert bus.get_proxy.call_count == 2  # root + one controller
+    assert bus.connection.signal_subscribe.call_count == 1
+
+    # Simulate NameOwnerChanged for com.core447.StreamController
+    owner_callback = bus.connection.signal_subscribe.call_args.args[-1]
+    owner_callback(None, None, None, None, "NameOwnerChanged", None)
+    client._root_proxy()
+    assert bus.get_proxy.call_count == 3
+
+
+def test_sync_client_waits_on_async_futures(monkeypatch):
+    """The blocking client returns the results of the async client's futures."""
+    from autopage import api_client
+
+    fake = MagicMock()
+    fake.get_pages.return_value = _resolved(["code", "kwrite"])
+    fake.add_page.return_value = _resolved(None)
+    monkeypatch.setattr(api_client, "AsyncStreamControllerClient", lambda: fake)
+
+    client = api_client.StreamControllerClient()
+    assert client.get_pages() == ["code", "kwrite"]
+    client.add_page("code", "{}")
+    fake.add_page.assert_called_once_with("code", "{}")
+
+
+def test_push_pages_pipelines_with_bounded_concurrency(mock_glib):
+    """push_pages keeps at most max_in_flight pushes outstanding and collects outcomes."""
+    from concurrent.futures import Future
+
+    from autopage import api_client
+
+    client = api_client.AsyncStreamControllerClient(MagicMock())
+    calls = []
+    pending = {}
+
+    def add_page(name, json_contents=""):
+        calls.append(("add", name))
+        pending[name] = Future()
+        return pending[name]
+
+    def remove_page(name):
+        calls.append(("remove", name))
+        return _resolved(None)
+
+    client.add_page = add_page
+    client.remove_page = remove_page
+
+    pages = [("a", "{}"), ("b", "{}"), ("c", "{}"), ("d", "{}")]
+    done = client.push_pages(pages, replace=True, existing={"d"}, max_in_flight=2)
+    assert calls == [("add", "a"), ("add", "b")]
+
+    pending["a"].set_exception(Exception("org.core447.Error.PageExists"))
+    assert calls[2:] == [("remove", "a"), ("add", "a")]  # replaced, still one slot
+
+    pending["b"].set_exception(Exception("boom"))
+    assert calls[4:] == [("add", "c")]
+
+    pending["a"].set_result(None)
+    assert calls[5:] == [("remove", "d"), ("add", "d")]  # known to exist: no failing add
+
+    pending["c"].set_result(None)
+    pending["d"].set_result(None)
+    outcomes = done.result(timeout=1)
+    assert outcomes["a"] is None and outcomes["c"] is None and outcomes["d"] is None
+    assert str(outcomes["b"]) == "boom"
+
+
+def test_push_pages_resolves_with_duplicates_and_stale_existing(mock_glib):
+    """Duplicate names push once (last wins); a failed RemovePage still adds the page."""
+    from autopage import api_client
+
+    client = api_client.AsyncStreamControllerClient(MagicMock())
+    added = []
+    client.add_page = lambda name, json_contents="": added.append(json_contents) or _resolved()
+    client.remove_page = lambda name: _resolved(exc=Exception("NoSuchPage"))
+
+    pages = [("a", "{1}"), ("a", "{2}")]
+    done = client.push_pages(pages, replace=True, existing={"a"})
+    assert done.result(timeout=1) == {"a": None}
+    assert added == ["{2}"]
+
+
+def test_push_pages_fails_instead_of_hanging_on_callback_error(mock_glib):
+    """An error while starting the next push fails the batch rather than stalling it."""
+    from concurrent.futures import Future
+
+    from autopage import api_client
+
+    client = api_client.AsyncStreamControllerClient(MagicMock())
+    first = Future()
+    pushes = iter([first])
+
+    def push_page(name, json_contents, replace, exists):
+        future = next(pushes, None)
+        if future is None:
+            raise RuntimeError("cannot push")
+        return future
+
+    client._push_page = push_page
+    done = client.push_pages([("a", "{}"), ("b", "{}")], max_in_flight=1)
+    first.set_result(None)  # its callback starts "b", which raises
+    with pytest.raises(RuntimeError, match="cannot push"):
+        done.result(timeout=1)
+
+
+def test_push_jsonpage_adds_when_known_page_is_gone(monkeypatch):
+    """A stale known_pages entry makes RemovePage fail; the page is still added."""
+    from autopage import api_client
+    from autopage.engine import push_jsonpage
+
+    client = MagicMock()
+    client.remove_page.side_effect = Exception("org.core447.Error.NoSuchPage")
+    monkeypatch.setattr(api_client, "get_client", lambda: client)
+
+    assert push_jsonpage("code", "{}", force=True, known_pages={"code"})
+    client.add_page.assert_called_once_with("code", "{}")
+
+
+def test_push_jsonpages_skips_known_and_records_pushed(monkeypatch):
+    """push_jsonpages skips known pages without --force and updates known_pages."""
+    from autopage import api_client
+    from autopage.engine import push_jsonpages
+
+    client = MagicMock()
+    client.push_pages.return_value = {"new": None, "bad": Exception("boom")}
+    monkeypatch.setattr(api_client, "get_client", lambda: client)
+
+    known = {"old"}
+    pages = [("old", "{}"), ("new", "{}"), ("bad", "{}"), ("new", "{2}")]
+    outcomes = push_jsonpages(pages, known_pages=known)
+
+    client.push_pages.assert_called_once_with(
+        [("new", "{}"), ("bad", "{}")], replace=False, existing=known
+    )
+    assert known == {"old", "new"}
+    assert set(outcomes) == {"new", "bad"}
+
+
+def test_push_jsonpages_sync_pushes_only_changed_pages(monkeypatch, tmp_path):
+    """With sync, existing pages are replaced only when their JSON hash changed."""
+    from autopage import api_client
+    from autopage.engine import push_jsonpages
+    from autopage.sync import PageHashes
+
+    client = MagicMock()
+    client.push_pages.side_effect = lambda pages, **kw: {name: None for name, _ in pages}
+    monkeypatch.setattr(api_client, "get_client", lambda: client)
+    state = tmp_path / "pages.json"
+
+    # Nothing recorded yet: an existing page can't be trusted, so it is replaced once
+    known = {"a"}
+    hashes = PageHashes(state)
+    push_jsonpages([("a", "{1}"), ("b", "{1}")], known_pages=known, sync=True, hashes=hashes)
+    hashes.save()
+    client.push_pages.assert_called_once_with(
+        [("a", "{1}"), ("b", "{1}")], replace=True, existing=known
+    )
+
+    client.push_pages.reset_mock()
+    hashes = PageHashes(state)
+    outcomes = push_jsonpages(
+        [("a", "{1}"), ("b", "{2}")], known_pages=known, sync=True, hashes=hashes
+    )
+    client.push_pages.assert_called_once_with([("b", "{2}")], replace=True, existing=known)
+    assert outcomes == {"b": None}
+    assert hashes.unchanged("b", "{2}") and not hashes.unchanged("b", "{1}")
+
+
+def test_client_mirrors_pages_from_properties_changed(mock_glib):
+    """Pages are read over DBus once, then kept current from signals and own calls."""
+    from autopage import api_client
+
+    bus = MagicMock()
+    client = api_client.AsyncStreamControllerClient(bus)
+
+    future = client.get_pages()
+    # Subscribed to changes before the Get went out, so none can slip between
+    calls = [
+        (c[0], c.args[2] if c[0] == "signal_subscribe" else None) for c in bus.connection.mock_calls
+    ]
+    assert calls.index(("signal_subscribe", "PropertiesChanged")) < calls.index(("call", None))
+    reply_callback = bus.connection.call.call_args.args[-1]
+    conn = MagicMock()
+    conn.call_finish.return_value.unpack.return_value = (["code"],)
+    reply_callback(conn, None)
+    assert future.result(timeout=1) == ["code"]
+
+    # Served from memory from now on
+    assert client.get_pages().result(timeout=1) == ["code"]
+    assert bus.connection.call.call_count == 1
+
+    # A PropertiesChanged signal (e.g. the user deleting a page) updates the mirror
+    params = MagicMock()
+    params.unpack.return_value = (api_client.IFACE, {"Pages": ["kwrite"]}, [])
+    client._on_state_changed(None, None, api_client.OBJECT, None, "PropertiesChanged", params)
+    assert client.get_pages().result(timeout=1) == ["kwrite"]
+
+    # Our own successful AddPage shows up without waiting for the signal
+    client._mirror_pages(add="code")()
+    assert client.get_pages().result(timeout=1) == ["kwrite", "code"]
+    assert bus.connection.call.call_count == 1
+
+
+def test_listen_narrows_subscription_and_filters_properties(mock_glib):
+    """listen() adds one match rule per path/interface and drops unwanted properties."""
+    from autopage import api_client
+
+    bus = MagicMock()
+    client = api_client.StreamControllerClient.__new__(api_client.StreamControllerClient)
+    client._bus = bus
+    received = []
+    client.listen(
+        lambda *change: received.append(change),
+        paths=[api_client.OBJECT],
+        interfaces=[api_client.IFACE],
+        properties={"ForegroundWindow"},
+    )
+    mock_glib.MainLoop.return_value.run.assert_called_once()
+
+    subscribe = bus.connection.signal_subscribe
+    assert subscribe.call_count == 1
+    sender, _, member, path, arg0, _, on_signal = subscribe.call_args.args
+    assert (member, path, arg0) == ("PropertiesChanged", api_client.OBJECT, api_client.IFACE)
+
+    params = MagicMock()
+    params.unpack.return_value = (
+        api_client.IFACE,
+        {"ForegroundWindow": ("term", "konsole"), "Brightness": 50},
+        ["Pages"],
+    )
+    on_signal(None, sender, api_client.OBJECT, None, member, params)
+    assert received == [
+        (api_client.OBJECT, api_client.IFACE, "ForegroundWindow", ("term", "konsole"))
+    ]
+
+
+def test_listen_reports_service_owner_changes(mock_glib):
+    """listen(on_owner_changed=...) forwards NameOwnerChanged for the service only."""
+    from autopage import api_client
+
+    bus = MagicMock()
+    client = api_client.StreamControllerClient.__new__(api_client.StreamControllerClient)
+    client._bus = bus
+    owners = []
+    client.listen(on_owner_changed=owners.append)
+
+    subscribe = bus.connection.signal_subscribe
+    owner_call = next(c for c in subscribe.call_args_list if c.args[2] == "NameOwnerChanged")
+    _, _, member, _, arg0, _, on_signal = owner_call.args
+    assert arg0 == api_client.SERVICE
+
+    params = MagicMock()
+    params.unpack.return_value = (api_client.SERVICE, ":1.5", "")
+    on_signal(None, None, None, None, member, params)
+    params.unpack.return_value = (api_client.SERVICE, "", ":1.9")
+    on_signal(None, None, None, None, member, params)
+    assert owners == ["", ":1.9"]
+
+
+def test_listen_and_autoswitch_resyncs_once_with_backoff(mock_glib, monkeypatch):
+    """Restarts share one resync chain that backs off until pages can be re-pushed."""
+    from itertools import count
+
+    from autopage import api_client, engine
+    from autopage.toml import MatchRule
+
+    client = MagicMock()
+    client.get_controllers.return_value = []
+    client.push_pages.return_value = {"code": None}
+    monkeypatch.setattr(api_client, "get_client", lambda: client)
+    monkeypatch.setattr(engine, "_fetch_known_pages", lambda: set())
+    monkeypatch.setattr(engine, "repo_to_jsonpage", lambda repo, **kw: ("code", "{}"))
+    definition = AutopageDef(matches=[MatchRule(class_pattern="code")])
+    page = engine._PreparedPage("code", definition, MagicMock(url="file:///r/code.ap.toml"))
+    monkeypatch.setattr(engine, "_prepare_all_repos", lambda **kw: [page])
+    source_ids = count(1)
+    mock_glib.timeout_add.side_effect = lambda *args: next(source_ids)
+
+    engine.listen_and_autoswitch()
+    listen_kwargs = client.listen.call_args.kwargs
+    on_changed, on_owner_changed = listen_kwargs["callback"], listen_kwargs["on_owner_changed"]
+    on_changed(api_client.OBJECT, api_client.IFACE, "ForegroundWindow", ("main.py", "code"))
+    client.add_page.assert_called_once_with("code", "{}")
+
+    # A flapping service replaces the pending resync instead of adding another
+    on_owner_changed(":1.5")
+    on_owner_changed(":1.6")
+    mock_glib.source_remove.assert_called_once_with(1)
+    delay, resync, arg = mock_glib.timeout_add.call_args.args
+    assert delay == arg == engine.RESYNC_INITIAL_DELAY_MS
+
+    client.get_pages.side_effect = Exception("ServiceUnknown")
+    resync(arg)
+    assert mock_glib.timeout_add.call_args.args[0] == 2 * engine.RESYNC_INITIAL_DELAY_MS
+
+    client.get_pages.side_effect = None
+    client.get_pages.return_value = []
+    resync(mock_glib.timeout_add.call_args.args[2])
+    client.push_pages.assert_called_once()
+    assert client.push_pages.call_args.args[0] == [("code", "{}")]
+    assert mock_glib.source_remove.call_count == 1  # nothing left pending
+
+
+# ── Fake StreamController service ────────────────────────────────────
+
+
+def test_fake_streamcontroller_pages(fake_streamcontroller):
+    """Pages pushed to the fake service can be listed, activated and removed."""
+    from autopage.api_client import get_client
+
+    client = get_client()
+    assert client.get_controllers() == ["fake-deck-1", "fake-deck-2"]
+    outcomes = client.push_pages([("one", "{}"), ("two", "{}")])
+    assert outcomes == {"one": None, "two": None}
+    assert sorted(client.get_pages()) == ["one", "two"]
+
+    client.set_active_page("fake-deck-1", "two")
+    assert client.get_controller_property("fake-deck-1", "ActivePageName") == "two"
+    client.remove_page("one")
+    assert client.get_pages() == ["two"]
+
+
+@pytest.mark.parametrize(
+    "fake_streamcontroller", [{"icon_packs": 3, "icons_per_pack": 250}], indirect=True
+)
+def test_fake_streamcontroller_icon_catalog(fake_streamcontroller):
+    """Catalog size is configurable and feeds IconCatalog like the real service."""
+    from autopage.api_client import get_client
+
+    assert len(get_client().get_icon_packs()) == 3
+    icons = IconCatalog(use_cache=False)
+    catalog, _ = icons.load()
+    assert len(catalog) == 3 * 250
+    assert icons.resolve("save") is not None
+
+
+@pytest.mark.parametrize("fake_streamcontroller", [{"fail": {"AddPage": 1.0}}], indirect=True)
+def test_fake_streamcontroller_failure_injection(fake_streamcontroller):
+    """Injected failures surface as errors from the client."""
+    from autopage.api_client import get_client
+
+    with pytest.raises(Exception, match="Injected"):
+        get_client().add_page("doomed", "{}")
+
+
+def test_bench_percentiles_use_nearest_rank():
+    """Benchmark summaries report nearest-rank percentiles in milliseconds."""
+    from autopage.api_client import _summarize
+
+    summary = _summarize([float(ms) for ms in range(100, 0, -1)], errors=2)
+    assert summary["count"] == 100
+    assert summary["errors"] == 2
+    assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert _summarize([], errors=3) == {"count": 0, "errors": 3}
+
+
+def test_run_bench_covers_each_operation():
+    """run_bench times reads, icon fetches, page pushes and page switches on the async client."""
+    from autopage.api_client import run_bench
+
+    client = MagicMock()
+    client.get_icon_packs.return_value = ["packA", "packB"]
+    client.get_controllers.return_value = ["deck-1"]
+    calls = client.async_client
+    for method in ("get_property", "add_page", "remove_page", "set_active_page"):
+        getattr(calls, method).side_effect = lambda *args: _resolved()
+    calls.get_icon_names.side_effect = lambda pack: (
+        _resolved(["x"]) if pack == "packA" else _resolved(exc=RuntimeError("NoSuchIconPack"))
+    )
+
+    report = run_bench(client, iterations=5, page_size=3, warmup=1)
+    results = report["results"]
+    assert set(results) == {
+        "get Pages",
+        "get Controllers",
+        "GetIconNames packA",
+        "GetIconNames packB",
+        "AddPage",
+        "RemovePage",
+        "SetActivePage",
+    }
+    assert results["get Pages"]["count"] == 5
+    assert results["AddPage"]["count"] == results["RemovePage"]["count"] == 5
+    assert results["GetIconNames packB"] == {"count": 0, "errors": 5}
+    assert calls.add_page.call_count == calls.remove_page.call_count == 6
+    assert calls.set_active_page.call_count == 6
+    assert len(json.loads(calls.add_page.call_args.args[1])["keys"]) == 3
+    # Only setup goes through the sync wrapper; the benchmark page is cleaned up again
+    client.get_property.assert_not_called()
+    assert client.add_page.call_count == client.remove_page.call_count == 1
+
+
+def test_bench_against_fake_streamcontroller(fake_streamcontroller):
+    """bench runs end to end against the fake service and leaves no pages behind."""
+    from autopage.api_client import get_client, run_bench
+
+    client = get_client()
+    report = run_bench(client, iterations=3)
+    assert all(result["errors"] == 0 for result in report["results"].values())
+    assert client.get_property("Pages") == []
+
+
+def test_run_batch_streams_json_results():
+    """Batch mode runs plain and JSON-line commands over one client, one result per line."""
+    import io
+
+    from autopage.api_client import run_batch
+
+    client = MagicMock()
+    client.get_pages.return_value = ["one", "two"]
+    client.remove_page.side_effect = RuntimeError("NoSuchPage")
+    script = [
+        "# provisioning\n",
+        "pages\n",
+        "\n",
+        '{"command": "add-page", "args": ["three", "{\\"keys\\": {}}"], "id": 7}\n',
+        "remove-page ghost\n",
+        "listen\n",
+        "no-such-command\n",
+    ]
+    out = io.StringIO()
+    assert run_batch(client, script, out) is False
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert records[0] == {"line": 2, "command": "pages", "ok": True, "result": ["one", "two"]}
+    assert records[1] == {"line": 4, "id": 7, "command": "add-page", "ok": True, "result": None}
+    client.add_page.assert_called_once_with("three", '{"keys": {}}')
+    assert records[2]["ok"] is False and "NoSuchPage" in records[2]["error"]
+    assert [r["ok"] for r in records[3:]] == [False, False]
+
+
+def test_run_batch_stop_on_error():
+    """--stop-on-error stops at the first failing command."""
+    import io
+
+    from autopage.api_client import run_batch
+
+    client = MagicMock()
+    client.remove_page.side_effect = RuntimeError("boom")
+    out = io.StringIO()
+    run_batch(client, ["remove-page a\n", "pages\n"], out, stop_on_error=True)
+    assert len(out.getvalue().splitlines()) == 1
+    client.get_pages.assert_not_called()
+
+
+def test_run_batch_keeps_help_and_nulls_out_of_the_stream(capsys):
+    """--help and usage errors become line errors; JSON null and objects map to CLI args."""
+    import io
+
+    from autopage.api_client import run_batch
+
+    client = MagicMock()
+    script = [
+        "pages --help\n",
+        "remove-page\n",
+        '{"command": "notify-foreground", "args": ["Terminal", null]}\n',
+        '{"command": "add-page", "args": ["empty", null]}\n',
+        '{"command": "add-page", "args": ["keys", {"keys": {}}]}\n',
+    ]
+    out = io.StringIO()
+    assert run_batch(client, script, out) is False
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(records) == 5
+    assert records[0]["ok"] is False and "help" in records[0]["error"].lower()
+    assert records[1]["ok"] is False and "name" in records[1]["error"]
+    assert all(r["ok"] for r in records[2:])
+    client.notify_foreground.assert_called_once_with("Terminal", "")
+    assert client.add_page.call_args_list == [call("empty", ""), call("keys", '{"keys": {}}')]
+    captured = capsys.readouterr()
+    assert captured.out == "" and captured.err == ""
+
+
+def test_listen_json_cli_narrows_paths_and_filters_properties(mock_glib, monkeypatch, capsys):
+    """listen --json subscribes per --path; --property drops other properties client-side."""
+    from autopage import api_client
+
+    bus = MagicMock()
+    client = api_client.StreamControllerClient.__new__(api_client.StreamControllerClient)
+    client._bus = bus
+    monkeypatch.setattr(api_client, "get_client", lambda: client)
+    monkeypatch.setattr(
+        "sys.argv",
+        ["streamclient", "listen", "--json", "--path", api_client.OBJECT, "--property", "Pages"],
+    )
+    api_client.main()
+
+    (subscription,) = bus.connection.signal_subscribe.call_args_list
+    sender, _, member, path, _, _, on_signal = subscription.args
+    assert path == api_client.OBJECT
+
+    params = MagicMock()
+    params.unpack.return_value = (
+        api_client.IFACE,
+        {"Pages": ["one", "two"], "ForegroundWindow": ("term", "konsole")},
+        [],
+    )
+    on_signal(None, sender, api_client.OBJECT, None, member, params)
+    params.unpack.return_value = (api_client.IFACE, {"ForegroundWindow": ("a", "b")}, [])
+    on_signal(None, sender, api_client.OBJECT, None, member, params)
+
+    (line,) = capsys.readouterr().out.splitlines()
+    record = json.loads(line)
+    assert record["path"] == api_client.OBJECT
+    assert record["interface"] == api_client.IFACE
+    assert (record["property"], record["value"]) == ("Pages", ["one", "two"])
+    assert isinstance(record["timestamp"], float)
+
+
+# ── Recipe discovery ─────────────────────────────────────────────────
+
+
+def _write_recipe_index(root, names, extra_refs=(), *, explicit_kind=True):
+    """Lay out a recipe index: ap.toml at *root* referencing app/<name>.ap.toml.
+
+    Without *explicit_kind* the recipes have no ``[repo]`` table, so their
+    kind comes from the file name.
+    """
+    refs = [f'[[repo-ref]]\ndir = "app/{name}.ap.toml"\n' for name in names]
+    refs += [f'[[repo-ref]]\nurl = "{url}"\n' for url in extra_refs]
+    (root / "ap.toml").write_text('[repo]\nkind = "index"\n\n' + "\n".join(refs))
+    (root / "app").mkdir(exist_ok=True)
+    header = '[repo]\nkind = "ap"\n\n' if explicit_kind else ""
+    for name in names:
+        body = f'[[match]]\nclass = "{name}"\n\n[[button]]\ncenter = "{name}"\n'
+        (root / "app" / f"{name}.ap.toml").write_text(header + body)
+
+
+def test_discover_recipes_fetches_siblings_concurrently(recipe_server):
+    """Sibling recipes download in parallel but come back in index order."""
+    from autopage.recipes import discover_recipes
+
+    names = [f"app{i:02d}" for i in range(12)]
+    _write_recipe_index(recipe_server.root, names)
+    recipe_server.delay = 0.05
+
+    repos = discover_recipes(recipe_server.url, "ap", workers=6)
+
+    assert [r.url for r in repos] == [f"{recipe_server.url}/app/{n}.ap.toml" for n in names]
+    assert [parse_toml_dict(r.config).buttons[0].center for r in repos] == names
+    assert 1 < recipe_server.max_in_flight <= 6
+    assert len(recipe_server.requests) == 1 + len(names)
+
+
+def test_discover_recipes_skips_broken_children(recipe_server, caplog):
+    """A recipe that fails to fetch is logged and left out; the rest still load."""
+    from autopage.recipes import discover_recipes
+
+    _write_recipe_index(
+        recipe_server.root, ["code", "kate"], extra_refs=[f"{recipe_server.url}/app/gone.ap.toml"]
+    )
+    repos = discover_recipes(recipe_server.url, "ap", workers=4)
+    assert [r.url.rsplit("/", 1)[1] for r in repos] == ["code.ap.toml", "kate.ap.toml"]
+    assert "gone.ap.toml" in caplog.text
+
+
+def test_discover_ap_repos_concurrent_matches_file_index(tmp_path, monkeypatch):
+    """--fetch-jobs walks a local (dev) index too, without toml-repo."""
+    from autopage.engine import _discover_ap_repos
+
+    root = tmp_path / "autopage-recipes"
+    root.mkdir()
+    _write_recipe_index(root, ["code", "kate", "ptyxis"])
+    monkeypatch.chdir(tmp_path)
+
+    repos = _discover_ap_repos(dev=True, fetch_jobs=4)
+    assert [r.url for r in repos] == [
+        f"file://{root}/app/{name}.ap.toml" for name in ("code", "kate", "ptyxis")
+    ]
+
+
+def test_discover_recipes_infers_kind_from_file_name(recipe_server):
+    """Recipes without a [repo] table are found by their .ap.toml file name."""
+    from autopage.recipes import discover_recipes
+
+    _write_recipe_index(recipe_server.root, ["code", "kate"], explicit_kind=False)
+    repos = discover_recipes(recipe_server.url, "ap", workers=4)
+    assert [r.url.rsplit("/", 1)[1] for r in repos] == ["code.ap.toml", "kate.ap.toml"]
+
+
+def _write_toml_repo_layout(root):
+    """An index using toml-repo's other rules: path refs, imports, subindexes, file names."""
+    (root / "app").mkdir(parents=True)
+    (root / "elsewhere").mkdir()
+    (root / "nested").mkdir()
+    (root / "plain").mkdir()
+    (root / "filenamed").mkdir()
+    (root / "ap.toml").write_text(
+        '[repo]\nkind = "index"\n\n'
+        '[[repo-ref]]\ndir = "app/code.ap.toml"\n\n'
+        f'[[repo-ref]]\ndir = "{root / "elsewhere" / "kate.ap.toml"}"\n\n'
+        '[[repo-ref]]\ndir = "nested"\n\n'
+        '[[repo-ref]]\ndir = "plain"\n\n'
+        '[[repo-ref]]\ndir = "filenamed"\n'
+    )
+    (root / "app" / "common.toml").write_text(
+        '[style]\nbackground = "blue"\n\n[button]\ntop = "T"\ncenter = "ignored"\n'
+    )
+    (root / "app" / "code.ap.toml").write_text(
+        '[default]\nimport = { node = "style", file = "common.toml" }\n\n'
+        '[[button]]\ncenter = "code"\nimport = { node = "button", file = "common.toml" }\n'
+    )
+    (root / "elsewhere" / "kate.ap.toml").write_text('[[button]]\ncenter = "kate"\n')
+    (root / "nested" / "ap.toml").write_text(
+        '[repo]\nkind = "index"\n\n[[repo-ref]]\ndir = "konsole.ap.toml"\n'
+    )
+    (root / "nested" / "konsole.ap.toml").write_text('[[button]]\ncenter = "konsole"\n')
+    # Without a [repo] table a directory config is ignored, refs and all
+    (root / "plain" / "ap.toml").write_text('[[repo-ref]]\ndir = "hidden.ap.toml"\n')
+    (root / "plain" / "hidden.ap.toml").write_text('[[button]]\ncenter = "hidden"\n')
+    _write_recipe_index(root / "filenamed", ["ptyxis"], explicit_kind=False)
+
+
+def test_discover_recipes_follows_toml_repo_rules(tmp_path):
+    """Path refs, subindexes and [import] tables resolve like toml-repo."""
+    from autopage.recipes import discover_recipes
+
+    _write_toml_repo_layout(tmp_path)
+    repos = discover_recipes(tmp_path.as_uri(), "ap", workers=4)
+
+    definitions = [parse_toml_dict(r.config) for r in repos]
+    assert [d.buttons[0].center for d in definitions] == ["code", "kate", "konsole", "ptyxis"]
+    code = definitions[0]
+    assert code.defaults == {"background": "blue"}
+    assert (code.buttons[0].top, code.buttons[0].background) == ("T", "blue")
+
+
+def test_discover_ap_repos_same_with_any_fetch_jobs(tmp_path, monkeypatch):
+    """toml-repo's sequential walk and the concurrent one find the same recipes."""
+    from autopage.engine import _discover_ap_repos
+
+    root = tmp_path / "autopage-recipes"
+    _write_toml_repo_layout(root)
+    # toml-repo reads a file:// dir as a path relative to the index; so must the walker
+    (root / "file:").mkdir()
+    (root / "file:" / "odd.ap.toml").write_text('[[button]]\ncenter = "odd"\n')
+    with (root / "ap.toml").open("a") as f:
+        f.write('\n[[repo-ref]]\ndir = "file:/odd.ap.toml"\n')
+        f.write(f'\n[[repo-ref]]\ndir = "{(root / "app" / "code.ap.toml").as_uri()}"\n')
+    monkeypatch.chdir(tmp_path)
+
+    sequential = _discover_ap_repos(dev=True, fetch_jobs=1)
+    concurrent = _discover_ap_repos(dev=True, fetch_jobs=4)
+    assert [r.url.rsplit("/", 1)[1] for r in sequential] == [
+        "code.ap.toml",
+        "kate.ap.toml",
+        "konsole.ap.toml",
+        "ptyxis.ap.toml",
+        "odd.ap.toml",
+        "code.ap.toml",
+    ]
+    assert [r.url for r in concurrent] == [r.url for r in sequential]
+    assert [parse_toml_dict(r.config) for r in concurrent] == [
+        parse_toml_dict(r.config) for r in sequential
+    ]
+
+
+def test_recipe_cache_revalidates_with_conditional_gets(recipe_server, tmp_path):
+    """A second revalidating walk gets 304s and reuses the cached texts."""
+    from autopage.recipes import RecipeCache, discover_recipes
+
+    _write_recipe_index(recipe_server.root, ["code", "kate"])
+    cache = RecipeCache(tmp_path / "recipes.json")
+    first = discover_recipes(recipe_server.url, "ap", workers=2, cache=cache)
+    cache.save()
+
+    recipe_server.responses.clear()
+    again = RecipeCache(tmp_path / "recipes.json")
+    second = discover_recipes(recipe_server.url, "ap", workers=2, cache=again)
+    assert [status for _, status in recipe_server.responses] == [304, 304, 304]
+    assert [r.config for r in second] == [r.config for r in first]
+    assert not again.changed
+
+
+def test_discover_recipes_cached_serves_stale_then_revalidates(recipe_server, tmp_path):
+    """Cached recipes are served at once; background revalidation picks up changes."""
+    from autopage.recipes import RecipeCache, discover_recipes_cached
+
+    _write_recipe_index(recipe_server.root, ["code"])
+    cache_file = tmp_path / "recipes.json"
+    discover_recipes_cached(recipe_server.url, "ap", cache=RecipeCache(cache_file))
+
+    recipe = recipe_server.root / "app" / "code.ap.toml"
+    recipe.write_text(recipe.read_text().replace('center = "code"', 'center = "VS Code"'))
+    recipe_server.requests.clear()
+
+    cache = RecipeCache(cache_file)
+    (repo,) = discover_recipes_cached(recipe_server.url, "ap", cache=cache)
+    assert parse_toml_dict(repo.config).buttons[0].center == "code"
+    cache.revalidation.join(timeout=10)
+    assert cache.changed == {repo.url}
+
+    (repo,) = discover_recipes_cached(recipe_server.url, "ap", cache=RecipeCache(cache_file))
+    assert parse_toml_dict(repo.config).buttons[0].center == "VS Code"
+
+
+def test_discover_recipes_cached_works_offline(recipe_server, tmp_path, caplog):
+    """With the server gone, discovery still answers from the cache."""
+    from autopage.recipes import RecipeCache, discover_recipes_cached
+
+    _write_recipe_index(recipe_server.root, ["code", "kate"])
+    cache_file = tmp_path / "recipes.json"
+    discover_recipes_cached(recipe_server.url, "ap", cache=RecipeCache(cache_file))
+    recipe_server.stop()
+
+    cache = RecipeCache(cache_file)
+    repos = discover_recipes_cached(recipe_server.url, "ap", cache=cache)
+    assert len(repos) == 2
+    cache.revalidation.join(timeout=10)
+    assert "using cached copy" in caplog.text
+
+
+# ── Compiled recipe bundle ───────────────────────────────────────────
+
+
+def test_compiled_bundle_round_trips_definitions(tmp_path, monkeypatch):
+    """--compile writes definitions that load back equal to freshly parsed ones."""
+    from autopage.bundle import CompiledRecipe, load_bundle
+    from autopage.engine import _discover_ap_repos, _recipes_base_url
+    from autopage.recipes import discover_recipes
+
+    root = tmp_path / "autopage-recipes"
+    root.mkdir()
+    # Kinds come from the file names, as toml-repo allows
+    _write_recipe_index(root, ["code", "kate"], explicit_kind=False)
+    monkeypatch.chdir(tmp_path)
+    base_url = _recipes_base_url(dev=True)
+    parsed = [parse_toml_dict(r.config) for r in discover_recipes(base_url, "ap")]
+    for definition, name in zip(parsed, ("code", "kate")):
+        definition.source_path = f"{base_url}/app/{name}.ap.toml"
+
+    assert main(["--dev", "--compile"]) == 0
+
+    bundled = load_bundle(base_url)
+    assert all(isinstance(r, CompiledRecipe) for r in bundled)
+    assert [r.to_definition() for r in bundled] == parsed
+    assert [r.url for r in _discover_ap_repos(dev=True)] == [r.url for r in bundled]
+
+
+def test_compiled_bundle_invalidated_by_changed_source(tmp_path, monkeypatch):
+    """Editing any recipe makes the bundle stale, so discovery parses again."""
+    from autopage.bundle import load_bundle
+    from autopage.engine import _discover_ap_repos, _recipes_base_url, compile_recipes
+
+    root = tmp_path / "autopage-recipes"
+    root.mkdir()
+    _write_recipe_index(root, ["code", "kate"])
+    monkeypatch.chdir(tmp_path)
+    compile_recipes(dev=True)
+
+    recipe = root / "app" / "kate.ap.toml"
+    recipe.write_text(recipe.read_text().replace('center = "kate"', 'center = "Kate"'))
+
+    assert load_bundle(_recipes_base_url(dev=True)) is None
+    repos = _discover_ap_repos(dev=True, fetch_jobs=2)
+    assert parse_toml_dict(repos[1].config).buttons[0].center == "Kate"
+
+
+def test_stale_bundle_discovery_reuses_checked_sources(recipe_server, monkeypatch):
+    """A stale bundle's freshness check is not followed by a second download."""
+    from autopage import engine
+
+    _write_recipe_index(recipe_server.root, ["code", "kate"])
+    monkeypatch.setattr(engine, "REMOTE_RECIPES_URL", recipe_server.url)
+    engine.compile_recipes()
+    recipe = recipe_server.root / "app" / "kate.ap.toml"
+    recipe.write_text(recipe.read_text().replace('center = "kate"', 'center = "Kate"'))
+    recipe_server.requests.clear()
+
+    repos = engine._discover_ap_repos()
+    assert [parse_toml_dict(r.config).buttons[0].center for r in repos] == ["code", "Kate"]
+    assert len(recipe_server.requests) == 3
+
+
+def test_discover_ap_repos_uses_current_bundle(recipe_server, monkeypatch):
+    """A current bundle is used as-is: recipes are re-read but never parsed."""
+    from autopage import engine
+    from autopage.bundle import CompiledRecipe
+
+    _write_recipe_index(recipe_server.root, ["code", "kate"])
+    monkeypatch.setattr(engine, "REMOTE_RECIPES_URL", recipe_server.url)
+    engine.compile_recipes()
+
+    monkeypatch.setattr(engine, "parse_toml_dict", MagicMock(side_effect=AssertionError))
+    repos = engine._discover_ap_repos(fetch_jobs=2)
+    assert all(isinstance(r, CompiledRecipe) for r in repos)
+    assert [engine._repo_definition(r).buttons[0].center for r in repos] == ["code", "kate"]
+
+
+# ── Parallel page generation ─────────────────────────────────────────
+
+
+def test_process_all_repos_jobs_matches_serial_output(monkeypatch, capsys, caplog):
+    """--jobs builds the same pages in the same order, with per-recipe errors."""
+    from autopage import engine, icons
+    from autopage.recipes import RecipeRepo
+
+    repos = [
+        RecipeRepo(
+            f"file:///r/app/{name}.ap.toml",
+            {"button": [{"center": name, "icon": name}, {"icon": "no_such_icon"}]},
+        )
+        for name in ("code", "kate", "ptyxis", "konsole")
+    ]
+    repos.insert(2, RecipeRepo("file:///r/app/broken.ap.toml", {"button": [1]}))
+    monkeypatch.setattr(engine, "_discover_ap_repos", lambda **kw: repos)
+    monkeypatch.setattr(engine, "_get_controller_serials", lambda: ["deck1"])
+    catalog = CompactCatalog({"pack": ["code", "kate", "konsole"]})
+    monkeypatch.setattr(icons, "build_icon_catalog", lambda *a, **kw: (catalog, "/data"))
+
+    engine.process_all_repos(dry_run=True)
+    serial = capsys.readouterr().out
+    engine.process_all_repos(dry_run=True, jobs=2)
+    parallel = capsys.readouterr().out
+
+    assert parallel == serial
+    assert serial.count("/data/icons/pack/icons/") == 3
+    errors = [r.getMessage() for r in caplog.records if r.levelname == "ERROR"]
+    assert len(errors) == 2 and all("broken.ap.toml" in e for e in errors)
+
+
+class _UnpicklableError(Exception):
+    def __reduce__(self):
+        raise TypeError("cannot pickle this error")
+
+
+class _MisbehavingRecipe:
+    """A recipe that only fails once a worker process reads its config."""
+
+    def __init__(self, url: str, crash: bool):
+        self.url = url
+        self.crash = crash
+
+    @property
+    def config(self):
+        if self.crash:
+            import os
+
+            os._exit(1)
+        raise _UnpicklableError("cannot be sent back")
+
+
+def test_generate_pages_parallel_survives_crashes_and_unpicklable_errors(monkeypatch):
+    """A crashed worker or an error that cannot be sent back fails only its own recipe."""
+    from autopage import engine, icons
+    from autopage.recipes import RecipeRepo
+
+    monkeypatch.setattr(engine, "_get_controller_serials", lambda: [])
+    monkeypatch.setattr(icons, "build_icon_catalog", lambda *a, **kw: (CompactCatalog(), "/data"))
+    monkeypatch.setattr(engine, "_picklable_repo", lambda repo: repo)
+
+    def recipe(name):
+        return RecipeRepo(f"file:///r/app/{name}.ap.toml", {"button": [{"center": name}]})
+
+    repos = [
+        recipe("code"),
+        _MisbehavingRecipe("file:///r/app/crash.ap.toml", crash=True),
+        recipe("kate"),
+        _MisbehavingRecipe("file:///r/app/odd.ap.toml", crash=False),
+        recipe("konsole"),
+    ]
+    results = list(engine._generate_pages_parallel(repos, jobs=2))
+
+    assert [r[0] for r in results if isinstance(r, tuple)] == ["code", "kate", "konsole"]
+    assert [type(r).__name__ for r in results if isinstance(r, Exception)] == [
+        "BrokenProcessPool",
+        "TypeError",
+    ]